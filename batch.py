@@ -0,0 +1,184 @@
+# batch.py
+# Vectorized scoring over many models at once (NumPy). Takes raw
+# signals as columns, e.g. a stored inventory re-scored with new weights
+# or size thresholds, and returns every sub-score, the per-device size
+# score matrix and net_score as arrays. Results equal the scalar
+# Metrics.compute_* path bit for bit; round() is matched by fixing up the
+# values np.round may take to the other side of a decimal tie.
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+
+from metrics import LGPLV21_COMPATIBLE_LICENSES, NET_WEIGHTS, RAMP_UP_MIN_WORDS, SIZE_THRESHOLDS_GB
+from readme import RAMP_UP_SECTIONS, PERF_KWS, DATASET_KWS
+
+# Column -> meaning. ramp_up_words is 2-D: one column per RAMP_UP_SECTIONS
+# entry. Flags are booleans; license may be given as strings instead.
+SIGNALS: Dict[str, str] = {
+    "license": "license name, or True if LGPLv2.1-compatible",
+    "size_gb": "model weight size in GB",
+    "ramp_up_words": "words under each ramp-up section of the code README",
+    "contributors": "GitHub contributor count",
+    "perf_claims": "code README mentions performance/benchmarks",
+    "has_code": "line has a code URL",
+    "has_dataset": "line has a dataset URL",
+    "dataset_readme_words": "dataset README word count",
+    "dataset_downloads": "dataset downloads",
+    "dataset_keywords": "dataset README has a dataset keyword",
+    "stars": "GitHub stars",
+    "forks": "GitHub forks",
+    "code_readme_words": "code README word count",
+    "maintained": "pushed within the last 180 days",
+}
+
+
+# Python's round(x, 2) for an array of non-negative floats. np.round
+# scales by 100 first, which can land a value just off a .xx5 tie on the
+# wrong side; only those rare values are redone with round().
+def round2(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    out = np.round(values, 2)
+    scaled = values * 100.0
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        out[near_tie] = [round(float(v), 2) for v in values[near_tie]]
+    return out
+
+
+def _flag(values: Any) -> np.ndarray:
+    return np.asarray(values, dtype=bool)
+
+
+def _license_ok(values: Any) -> np.ndarray:
+    arr = np.asarray(values)
+    if arr.dtype == bool:
+        return arr
+    return np.array([any(l in str(v).lower() for l in LGPLV21_COMPATIBLE_LICENSES) for v in arr], dtype=bool)
+
+
+def license_score(license: Any) -> np.ndarray:
+    return np.where(_license_ok(license), 1.0, 0.0)
+
+
+# (n, devices) matrix, columns in thresholds order
+def size_score(size_gb: Any, thresholds: Mapping[str, float] = SIZE_THRESHOLDS_GB) -> np.ndarray:
+    size_gb = np.asarray(size_gb, dtype=np.float64)
+    columns = []
+    for limit in thresholds.values():
+        score = round2(np.minimum(np.maximum(0.0, 1.0 - size_gb / limit), 1.0))
+        columns.append(np.where(size_gb > 0, score, 0.0))
+    return np.stack(columns, axis=1) if columns else np.zeros((len(size_gb), 0))
+
+
+def ramp_up_score(ramp_up_words: Any) -> np.ndarray:
+    words = np.asarray(ramp_up_words, dtype=np.float64)
+    if words.ndim != 2 or words.shape[1] == 0:
+        return np.zeros(len(words))
+    # Summed column by column, left to right, like the scalar sum()
+    total = np.zeros(len(words))
+    for j in range(words.shape[1]):
+        total = total + np.minimum(words[:, j] / RAMP_UP_MIN_WORDS, 1.0)
+    return round2(total / words.shape[1])
+
+
+def bus_factor_score(contributors: Any) -> np.ndarray:
+    n = np.asarray(contributors)
+    return np.select([n >= 10, n >= 7, n >= 5], [1.0, 0.5, 0.3], 0.0)
+
+
+def perf_claims_score(perf_claims: Any) -> np.ndarray:
+    return np.where(_flag(perf_claims), 1.0, 0.0)
+
+
+def ds_code_score(has_code: Any, has_dataset: Any) -> np.ndarray:
+    return (_flag(has_code).astype(np.float64) + _flag(has_dataset).astype(np.float64)) / 2.0
+
+
+def ds_quality_score(readme_words: Any, downloads: Any, keywords: Any) -> np.ndarray:
+    readme_point = np.where(np.asarray(readme_words) >= 820, 0.3, 0.0)
+    downloads = np.asarray(downloads)
+    download_point = np.select([downloads >= 100000, downloads >= 50000], [0.2, 0.15], 0.0)
+    kw_point = np.where(_flag(keywords), 0.5, 0.0)
+    return readme_point + download_point + kw_point
+
+
+def code_quality_score(stars: Any, forks: Any, readme_words: Any, maintained: Any) -> np.ndarray:
+    stats_point = np.where(np.asarray(stars) >= 10000, 0.1, 0.0)
+    stats_point = stats_point + np.where(np.asarray(forks) >= 5000, 0.1, 0.0)
+    readme_words = np.asarray(readme_words)
+    readme_point = np.select([readme_words >= 1700, readme_words >= 1000], [0.3, 0.2], 0.0)
+    maintenance_point = np.where(_flag(maintained), 0.2, 0.0)
+    return stats_point + readme_point + maintenance_point
+
+
+# Weighted sum in Metrics.compute_net's order, capped at 1 and rounded
+def net_score(scores: Mapping[str, np.ndarray], weights: Mapping[str, float] = NET_WEIGHTS) -> np.ndarray:
+    net = (
+        scores["license"] * weights["license"] +
+        scores["size_score"].min(axis=1) * weights["size"] +
+        scores["ramp_up_time"] * weights["ramp"] +
+        scores["bus_factor"] * weights["bus"] +
+        scores["performance_claims"] * weights["perf"] +
+        scores["dataset_and_code_score"] * weights["ds_code"] +
+        scores["dataset_quality"] * weights["ds_quality"] +
+        scores["code_quality"] * weights["code_quality"]
+    )
+    return round2(np.minimum(net, 1.0))
+
+
+# All scores for columnar signals (see SIGNALS). Returns output field ->
+# array; size_score is (n, devices) with devices listed under "size_devices".
+def score_batch(signals: Mapping[str, Any], weights: Optional[Mapping[str, float]] = None,
+                size_thresholds: Optional[Mapping[str, float]] = None) -> Dict[str, Any]:
+    missing = [name for name in SIGNALS if name not in signals]
+    if missing:
+        raise KeyError(f"Missing signals: {', '.join(missing)}")
+    thresholds = size_thresholds if size_thresholds is not None else SIZE_THRESHOLDS_GB
+
+    scores: Dict[str, Any] = {
+        "license": license_score(signals["license"]),
+        "size_score": size_score(signals["size_gb"], thresholds),
+        "ramp_up_time": ramp_up_score(signals["ramp_up_words"]),
+        "bus_factor": bus_factor_score(signals["contributors"]),
+        "performance_claims": perf_claims_score(signals["perf_claims"]),
+        "dataset_and_code_score": ds_code_score(signals["has_code"], signals["has_dataset"]),
+        "dataset_quality": ds_quality_score(signals["dataset_readme_words"], signals["dataset_downloads"],
+                                            signals["dataset_keywords"]),
+        "code_quality": code_quality_score(signals["stars"], signals["forks"], signals["code_readme_words"],
+                                           signals["maintained"]),
+    }
+    scores["net_score"] = net_score(scores, weights if weights is not None else NET_WEIGHTS)
+    scores["size_devices"] = tuple(thresholds)
+    return scores
+
+
+# Rows of signals (dicts, e.g. from a stored inventory) -> columns
+def columns(rows: Iterable[Mapping[str, Any]], names: Sequence[str] = tuple(SIGNALS)) -> Dict[str, np.ndarray]:
+    rows = list(rows)
+    cols = {name: np.array([row[name] for row in rows]) for name in names if name != "ramp_up_words"}
+    if "ramp_up_words" in names:
+        cols["ramp_up_words"] = np.array([row["ramp_up_words"] for row in rows],
+                                         dtype=np.float64).reshape(len(rows), len(RAMP_UP_SECTIONS))
+    return cols
+
+
+# Raw signals of one Model, as read by the scalar metrics
+def model_signals(mod: Any) -> Dict[str, Any]:
+    code = mod.readme_analysis("code")
+    stats = mod.get_git_stats()
+    return {
+        "license": mod.get_license(),
+        "size_gb": mod.get_size(),
+        "ramp_up_words": [code.section_words(section, RAMP_UP_SECTIONS) for section in RAMP_UP_SECTIONS],
+        "contributors": mod.get_contrib(),
+        "perf_claims": code.contains_any(PERF_KWS),
+        "has_code": bool(mod.code_dict),
+        "has_dataset": bool(mod.dataset_dict),
+        "dataset_readme_words": mod.len_readme("dataset"),
+        "dataset_downloads": mod.get_downloads("dataset"),
+        "dataset_keywords": mod.kw_check(DATASET_KWS, "dataset"),
+        "stars": stats.get("stars", 0),
+        "forks": stats.get("forks", 0),
+        "code_readme_words": mod.len_readme("code"),
+        "maintained": mod.last_modified("github", 180),
+    }
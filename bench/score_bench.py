@@ -0,0 +1,180 @@
+# bench/score_bench.py
+# End-to-end scoring benchmark against the local stub server: runs
+# main.py (or Metrics.run in-process with --inprocess) over synthetic
+# input files and reports throughput, p50/p99 latency per metric, requests
+# per endpoint and peak RSS. Needs no network, so it can run in CI:
+#
+#   python bench/score_bench.py --sizes 1,100 --latency-ms 20 --json out.json
+#   python bench/score_bench.py --sizes 100 --baseline out.json   # exit 1 on regression
+import os
+import sys
+import json
+import time
+import shlex
+import argparse
+import resource
+import subprocess
+import tempfile
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_server import StubServer, add_config_args, config_from_args
+
+METRICS = ("net_score", "ramp_up_time", "bus_factor", "performance_claims", "license",
+           "size_score", "dataset_and_code_score", "dataset_quality", "code_quality")
+
+
+# n input lines; models are unique, code repos and datasets repeat across
+# lines and every few lines leave them empty to exercise carry-forward
+def synthetic_inputs(n: int, repos: int = 200, datasets: int = 50) -> List[str]:
+    lines = []
+    for i in range(n):
+        model = f"https://huggingface.co/org{i % 97}/model-{i}"
+        if i % 5 == 4:
+            lines.append(f",,{model}")
+            continue
+        code = f"https://github.com/owner{i % repos}/repo{i % repos}"
+        dataset = f"https://huggingface.co/datasets/org{i % datasets}/data{i % datasets}"
+        lines.append(f"{code},{dataset},{model}")
+    return lines
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))
+    return float(ordered[index])
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    latency: Dict[str, Dict[str, float]] = {}
+    for metric in METRICS:
+        values = [r[f"{metric}_latency"] for r in records if f"{metric}_latency" in r]
+        latency[metric] = {"p50": percentile(values, 50), "p99": percentile(values, 99)}
+    return latency
+
+
+# main.py in a child process; its own rusage gives the peak RSS of that run
+def run_main(input_path: str, redirect: str, jobs: int, extra: List[str]) -> tuple[List[Dict[str, Any]], float, int]:
+    env = dict(os.environ, SCORE_REDIRECT=redirect)
+    for key in ("SCORE_CACHE", "SCORE_OFFLINE", "GITHUB_TOKEN", "GH_TOKEN", "HF_TOKEN"):
+        env.pop(key, None)
+    cmd = [sys.executable, os.path.join(ROOT, "main.py"), input_path, "--jobs", str(jobs)] + extra
+    with tempfile.TemporaryFile() as out:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=out, stderr=subprocess.DEVNULL)
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - t0
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode != 0:
+            raise RuntimeError(f"main.py exited with {proc.returncode}")
+        out.seek(0)
+        records = [json.loads(line) for line in out.read().decode().splitlines() if line.strip()]
+    return records, elapsed, usage.ru_maxrss * 1024
+
+
+# Metrics.run line by line in this process (peak RSS is this process's)
+def run_inprocess(lines: List[str], stub: StubServer) -> tuple[List[Dict[str, Any]], float, int]:
+    import net
+    from metrics import Metrics
+    net.redirect_hosts(stub.redirects())
+    records = []
+    t0 = time.perf_counter()
+    for line in lines:
+        code_url, dataset_url, model_url = [p.strip() for p in line.split(",")]
+        records.append(Metrics({"code_url": code_url, "dataset_url": dataset_url, "model_url": model_url}).run())
+    elapsed = time.perf_counter() - t0
+    return records, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def bench_size(n: int, stub: StubServer, args: argparse.Namespace) -> Dict[str, Any]:
+    lines = synthetic_inputs(n)
+    stub.reset_counts()
+    if args.inprocess:
+        records, elapsed, rss = run_inprocess(lines, stub)
+    else:
+        redirect = ",".join(f"{host}={base}" for host, base in stub.redirects().items())
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("\n".join(lines) + "\n")
+        try:
+            records, elapsed, rss = run_main(f.name, redirect, args.jobs, shlex.split(args.main_args))
+        finally:
+            os.unlink(f.name)
+
+    counts = stub.reset_counts()
+    return {
+        "lines": n,
+        "seconds": round(elapsed, 3),
+        "lines_per_second": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize(records),
+        "requests": {f"{host} {route}": c for (host, route), c in sorted(counts.items())},
+        "requests_total": sum(counts.values()),
+        "peak_rss_mb": round(rss / (1024 * 1024), 1),
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    for res in results:
+        print(f"\n== {res['lines']} lines: {res['seconds']} s, {res['lines_per_second']} lines/s, "
+              f"{res['requests_total']} requests, peak RSS {res['peak_rss_mb']} MB")
+        print(f"  {'metric':<24}{'p50 ms':>10}{'p99 ms':>10}")
+        for metric, lat in res["latency_ms"].items():
+            print(f"  {metric:<24}{lat['p50']:>10.0f}{lat['p99']:>10.0f}")
+        for endpoint, count in res["requests"].items():
+            print(f"  {endpoint:<40}{count:>8}")
+
+
+# Slower throughput or more requests than the baseline (beyond tolerance)
+def regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    previous = {res["lines"]: res for res in baseline}
+    found = []
+    for res in results:
+        old = previous.get(res["lines"])
+        if old is None:
+            continue
+        if res["lines_per_second"] < old["lines_per_second"] * (1 - tolerance):
+            found.append(f"{res['lines']} lines: {res['lines_per_second']} lines/s "
+                         f"(baseline {old['lines_per_second']})")
+        if res["requests_total"] > old["requests_total"]:
+            found.append(f"{res['lines']} lines: {res['requests_total']} requests "
+                         f"(baseline {old['requests_total']})")
+    return found
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Scoring benchmark against a local GitHub/HF stub")
+    parser.add_argument("--sizes", default="1,100,10000", help="comma separated input sizes in lines")
+    parser.add_argument("--jobs", type=int, default=8, help="--jobs passed to main.py")
+    parser.add_argument("--main-args", default="", help='extra main.py arguments, e.g. "--state s.db"')
+    parser.add_argument("--inprocess", action="store_true", help="call Metrics.run directly instead of main.py")
+    parser.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="fail if results regress against this JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed throughput drop vs baseline")
+    add_config_args(parser)
+    return parser
+
+
+def main(argv: List[str]) -> int:
+    args = build_parser().parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    with StubServer(config_from_args(args)) as stub:
+        results = [bench_size(n, stub, args) for n in sizes]
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
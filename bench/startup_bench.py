@@ -0,0 +1,145 @@
+# bench/startup_bench.py
+# Cold-start benchmark for the CLI: runs main.py on its light paths
+# (--help, a usage error, a bare import) and on an empty scoring run,
+# reporting median wall time, total import time from `python -X
+# importtime` and the slowest top-level imports. Fails if a path imports
+# a heavy module it does not need (pytest, requests, huggingface_hub, ...):
+#
+#   python bench/startup_bench.py --runs 20 --json startup.json
+#   python bench/startup_bench.py --baseline startup.json   # exit 1 on regression
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("pytest", "requests", "huggingface_hub", "numpy")
+
+# name -> (interpreter arguments, modules that must not be imported);
+# "{empty}" is replaced by an empty input file
+PATHS: Dict[str, Tuple[List[str], Tuple[str, ...]]] = {
+    "help": (["main.py", "--help"], HEAVY),
+    "usage_error": (["main.py"], HEAVY),
+    "import": (["-c", "import main"], HEAVY),
+    "score_empty": (["main.py", "{empty}"], ("pytest", "numpy")),
+}
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    for key in ("SCORE_CACHE", "SCORE_OFFLINE", "SCORE_REDIRECT", "PYTHONPROFILEIMPORTTIME"):
+        env.pop(key, None)
+    return env
+
+
+def _command(argv: List[str], empty: str, importtime: bool = False) -> List[str]:
+    flags = ["-X", "importtime"] if importtime else []
+    return [sys.executable] + flags + [a.replace("{empty}", empty) for a in argv]
+
+
+# `-X importtime` stderr -> (module, self us, cumulative us, nesting depth)
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def bench_path(name: str, runs: int, top: int, empty: str) -> Dict[str, Any]:
+    argv, forbidden = PATHS[name]
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(_command(argv, empty), cwd=ROOT, env=_env(), capture_output=True)
+        times.append(time.perf_counter() - t0)
+
+    proc = subprocess.run(_command(argv, empty, importtime=True), cwd=ROOT, env=_env(),
+                          capture_output=True, text=True)
+    rows = parse_importtime(proc.stderr)
+    top_level = [r for r in rows if r[3] == 0]
+    imported = {r[0] for r in rows}
+    return {
+        "path": name,
+        "command": " ".join(argv),
+        "wall_ms_median": round(statistics.median(times) * 1000.0, 1),
+        "wall_ms_min": round(min(times) * 1000.0, 1),
+        "import_ms": round(sum(r[2] for r in top_level) / 1000.0, 1),
+        "modules": len(imported),
+        "slowest_imports": [{"module": m, "ms": round(c / 1000.0, 1)}
+                            for m, _, c, _ in sorted(top_level, key=lambda r: -r[2])[:top]],
+        "heavy_imports": sorted(m for m in forbidden if m in imported),
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    for res in results:
+        print(f"\n== {res['path']} ({res['command']}): median {res['wall_ms_median']} ms, "
+              f"min {res['wall_ms_min']} ms, imports {res['import_ms']} ms over {res['modules']} modules")
+        for entry in res["slowest_imports"]:
+            print(f"  {entry['module']:<40}{entry['ms']:>10.1f} ms")
+        if res["heavy_imports"]:
+            print(f"  HEAVY: {', '.join(res['heavy_imports'])}")
+
+
+# Slower median start-up than the baseline (beyond tolerance)
+def regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    previous = {res["path"]: res for res in baseline}
+    found = []
+    for res in results:
+        old = previous.get(res["path"])
+        if old is not None and res["wall_ms_median"] > old["wall_ms_median"] * (1 + tolerance):
+            found.append(f"{res['path']}: {res['wall_ms_median']} ms (baseline {old['wall_ms_median']} ms)")
+    return found
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="CLI start-up time and import benchmark")
+    parser.add_argument("--paths", default=",".join(PATHS), help="comma separated paths to run")
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per path (median reported)")
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports listed per path")
+    parser.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="fail if results regress against this JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed start-up slowdown vs baseline")
+    return parser
+
+
+def main(argv: List[str]) -> int:
+    args = build_parser().parse_args(argv)
+    names = [n.strip() for n in args.paths.split(",") if n.strip()]
+    unknown = [n for n in names if n not in PATHS]
+    if unknown:
+        print(f"Unknown paths: {', '.join(unknown)} (known: {', '.join(PATHS)})", file=sys.stderr)
+        return 2
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        empty = f.name
+    try:
+        results = [bench_path(name, args.runs, args.top, empty) for name in names]
+    finally:
+        os.unlink(empty)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    found = [f"{res['path']} imports {', '.join(res['heavy_imports'])}" for res in results if res["heavy_imports"]]
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found += regressions(results, json.load(f), args.tolerance)
+    for line in found:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
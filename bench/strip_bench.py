@@ -0,0 +1,70 @@
+# bench/strip_bench.py
+# Throughput of README cleaning (strip.clean_readme) in MB/s.
+#
+#   python bench/strip_bench.py [README files or directories ...]
+#
+# Without arguments the corpus is the package long descriptions (the
+# README each project ships on PyPI) found in the installed site-packages.
+import os
+import sys
+import glob
+import time
+import argparse
+import site
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from strip import clean_readme
+
+
+def load_corpus(paths: list[str]) -> list[str]:
+    files: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += glob.glob(os.path.join(path, "**", "*.md"), recursive=True)
+            files += glob.glob(os.path.join(path, "**", "README*"), recursive=True)
+        else:
+            files.append(path)
+    if not paths:
+        for sp in site.getsitepackages():
+            files += glob.glob(os.path.join(sp, "*.dist-info", "METADATA"))
+
+    texts = []
+    for f in files:
+        try:
+            with open(f, "r", encoding="utf-8") as fh:
+                texts.append(fh.read())
+        except (OSError, UnicodeDecodeError):
+            continue
+    return texts
+
+
+def measure(fn, texts: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="README cleaning throughput")
+    parser.add_argument("paths", nargs="*", help="README files or directories")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_corpus(args.paths)
+    if not texts:
+        print("No README files found", file=sys.stderr)
+        sys.exit(1)
+    mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    largest = max(len(t.encode("utf-8")) for t in texts) / 1e6
+    print(f"corpus: {len(texts)} files, {mb:.2f} MB (largest {largest:.2f} MB)")
+
+    seconds = measure(clean_readme, texts, args.repeat)
+    print(f"clean_readme {mb / seconds:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
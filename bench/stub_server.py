@@ -0,0 +1,325 @@
+# bench/stub_server.py
+# Local stand-in for the GitHub and Hugging Face endpoints the scorer
+# calls. Requests arrive as /<original host>/<original path> (see
+# net.redirect_hosts / SCORE_REDIRECT) and are answered from recorded
+# responses (--replay) or from synthetic payloads shaped like the real
+# ones, after a configurable delay. GitHub responses carry rate-limit
+# headers and turn into 403s once the configured quota is used up.
+#
+#   python bench/stub_server.py --port 8000 --latency-ms 20
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+HOSTS = ("api.github.com", "github.com", "huggingface.co")
+
+README_SECTIONS = ("Installation", "Usage", "Quickstart", "Evaluation", "License")
+README_FILLER = ("model", "weights", "tokenizer", "prompt", "batch", "layer", "vector", "corpus")
+
+Reply = Tuple[int, Dict[str, str], bytes]
+
+
+class StubConfig:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, readme_bytes: int = 8 * 1024,
+                 rate_limit: int = 0, rate_window: float = 10.0, contributors: int = 12,
+                 replay: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.readme_bytes = readme_bytes
+        # GitHub requests allowed per window (0: unlimited)
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.contributors = contributors
+        # "host/path?query" or "host/path" -> {"status", "headers", "body"}
+        self.replay = replay or {}
+
+
+# Synthetic timestamps count back from the start of the current UTC day, so
+# repeated runs (e.g. incremental re-scoring) see unchanged repositories
+def _day_start() -> float:
+    return time.time() // 86400 * 86400
+
+
+def _seed(path: str) -> int:
+    return int.from_bytes(hashlib.sha1(path.encode()).digest()[:4], "big")
+
+
+# Deterministic README of about size bytes with the sections the metrics look for
+def synthetic_readme(name: str, size: int) -> str:
+    rng = random.Random(_seed(name))
+    parts = [f"# {name}\n\nA synthetic README with accuracy and benchmark results.\n"]
+    length = len(parts[0])
+    while length < size:
+        section = f"\n## {rng.choice(README_SECTIONS)}\n\n"
+        words = " ".join(rng.choice(README_FILLER) for _ in range(rng.randint(20, 80)))
+        parts.append(section + words + ".\n")
+        length += len(parts[-1])
+    return "".join(parts)[:max(size, 0)]
+
+
+class StubServer:
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or StubConfig()
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._used = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # host -> base URL, for net.redirect_hosts
+    def redirects(self) -> Dict[str, str]:
+        return {host: f"{self.base_url}/{host}" for host in HOSTS}
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reset_counts(self) -> Counter:
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+        return counts
+
+    # Start over with config (default: StubConfig()), no counts and a full
+    # rate-limit quota, e.g. when one server is shared by many tests
+    def reset(self, config: Optional[StubConfig] = None) -> None:
+        with self._lock:
+            self.config = config or StubConfig()
+            self.counts = Counter()
+            self._window_start, self._used = time.time(), 0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                self._reply(server.handle("GET", self.path))
+
+            def do_HEAD(self) -> None:
+                self._reply(server.handle("HEAD", self.path), body=False)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                self.rfile.read(length)
+                self._reply(server.handle("POST", self.path))
+
+            def _reply(self, reply: Reply, body: bool = True) -> None:
+                status, headers, payload = reply
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if "Content-Length" not in headers:
+                    self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(payload)
+
+            def handle(self) -> None:
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client gave up (deadline, hedged request lost)
+                    pass
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    # Count, delay, rate-limit and answer one request
+    def handle(self, method: str, raw_path: str) -> Reply:
+        parts = urlsplit(raw_path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        path = "/" + path
+        with self._lock:
+            self.counts[(host, _route(path))] += 1
+
+        cfg = self.config
+        delay = cfg.latency_ms + (random.uniform(0, cfg.jitter_ms) if cfg.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        headers: Dict[str, str] = {}
+        if host == "api.github.com":
+            limited, headers = self._rate_limit()
+            if limited:
+                return 403, headers, b'{"message": "API rate limit exceeded"}'
+
+        recorded = cfg.replay.get(f"{host}{path}?{parts.query}") or cfg.replay.get(f"{host}{path}")
+        if recorded is not None:
+            body = recorded.get("body", "")
+            if not isinstance(body, str):
+                body = json.dumps(body)
+            headers.update(recorded.get("headers", {}))
+            return recorded.get("status", 200), headers, body.encode()
+
+        status, extra, body = self._synthetic(method, host, path, parse_qs(parts.query))
+        headers.update(extra)
+        return status, headers, body
+
+    def _rate_limit(self) -> Tuple[bool, Dict[str, str]]:
+        cfg = self.config
+        if not cfg.rate_limit:
+            return False, {}
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= cfg.rate_window:
+                self._window_start, self._used = now, 0
+            reset = self._window_start + cfg.rate_window
+            limited = self._used >= cfg.rate_limit
+            if not limited:
+                self._used += 1
+            remaining = cfg.rate_limit - self._used
+        return limited, {
+            "X-RateLimit-Limit": str(cfg.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(reset + 1)),
+        }
+
+    def _synthetic(self, method: str, host: str, path: str, query: Dict[str, list]) -> Reply:
+        cfg = self.config
+        seed = _seed(path)
+        segs = [p for p in path.split("/") if p]
+        as_json = {"Content-Type": "application/json; charset=utf-8"}
+
+        if host == "huggingface.co":
+            if segs[:2] == ["api", "models"] and len(segs) >= 4:
+                repo = "/".join(segs[2:4])
+                return 200, as_json, json.dumps({
+                    "id": repo,
+                    "downloads": seed % 500000,
+                    "likes": seed % 1000,
+                    "lastModified": time.strftime("%Y-%m-%dT%H:%M:%S.000Z",
+                                                  time.gmtime(_day_start() - seed % (400 * 86400))),
+                    "cardData": {"license": ("mit", "apache-2.0", "cc-by-nc-4.0")[seed % 3]},
+                    "siblings": [
+                        {"rfilename": "model.safetensors", "size": (seed % 4000 + 100) * 1024 * 1024},
+                        {"rfilename": "pytorch_model.bin", "size": (seed % 4000 + 100) * 1024 * 1024},
+                        {"rfilename": "config.json", "size": 700},
+                    ],
+                }).encode()
+            if segs[:2] == ["api", "datasets"] and len(segs) >= 4:
+                repo = "/".join(segs[2:4])
+                return 200, as_json, json.dumps({
+                    "id": repo,
+                    "downloads": seed % 200000,
+                    "cardData": {"license": "mit", "task_categories": ["text-classification"]},
+                }).encode()
+            if "raw" in segs and segs[-1] == "README.md":
+                return 200, {"Content-Type": "text/plain; charset=utf-8"}, \
+                    synthetic_readme(path, cfg.readme_bytes).encode()
+            if "resolve" in segs:
+                return 200, {"Content-Length": str(seed % (1 << 30))}, b""
+            return 404, as_json, b'{"error": "not found"}'
+
+        if host == "github.com" and "raw" in segs:
+            return 200, {"Content-Type": "text/plain; charset=utf-8"}, synthetic_readme(path, cfg.readme_bytes).encode()
+
+        if host == "api.github.com":
+            if segs == ["graphql"]:
+                return 200, as_json, b'{"data": {}}'
+            if len(segs) >= 3 and segs[0] == "repos":
+                owner, repo = segs[1], segs[2]
+                tail = segs[3:]
+                if not tail:
+                    pushed = _day_start() - seed % (200 * 86400)
+                    return 200, as_json, json.dumps({
+                        "full_name": f"{owner}/{repo}",
+                        "license": {"name": ("MIT License", "Apache License 2.0", "GNU General Public License v3.0")[seed % 3]},
+                        "stargazers_count": seed % 50000,
+                        "forks_count": seed % 5000,
+                        "pushed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(pushed)),
+                    }).encode()
+                if tail == ["contributors"]:
+                    count = cfg.contributors
+                    page = [{"login": "user1", "contributions": 100}]
+                    headers = dict(as_json)
+                    if int(query.get("per_page", ["30"])[0]) < count:
+                        base = f"https://api.github.com/repos/{owner}/{repo}/contributors?per_page=1"
+                        headers["Link"] = f'<{base}&page=2>; rel="next", <{base}&page={count}>; rel="last"'
+                    return 200, headers, json.dumps(page).encode()
+                if tail == ["commits"]:
+                    return 200, as_json, json.dumps([
+                        {"commit": {"committer": {"date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(_day_start()))}}}
+                    ]).encode()
+        return 404, as_json, b'{"message": "Not Found"}'
+
+
+# Route label for request counts: the path with repo names dropped
+def _route(path: str) -> str:
+    segs = [p for p in path.split("/") if p]
+    if segs[:2] in (["api", "models"], ["api", "datasets"]):
+        return "/".join(segs[:2])
+    if segs[:1] == ["repos"]:
+        return "/".join(["repos"] + segs[3:4])
+    if "raw" in segs:
+        return "raw"
+    if "resolve" in segs:
+        return "resolve"
+    return "/".join(segs[:1])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Local GitHub/Hugging Face stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_config_args(parser)
+    return parser
+
+
+def add_config_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay, uniform in [0, N]")
+    parser.add_argument("--readme-bytes", type=int, default=8 * 1024, help="size of synthetic READMEs")
+    parser.add_argument("--rate-limit", type=int, default=0,
+                        help="GitHub API requests allowed per window before 403s (0: unlimited)")
+    parser.add_argument("--rate-window", type=float, default=10.0, help="rate-limit window in seconds")
+    parser.add_argument("--replay", metavar="FILE",
+                        help='JSON of recorded responses: {"host/path": {"status", "headers", "body"}}')
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    replay = None
+    if args.replay:
+        with open(args.replay, encoding="utf-8") as f:
+            replay = json.load(f)
+    return StubConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, readme_bytes=args.readme_bytes,
+                      rate_limit=args.rate_limit, rate_window=args.rate_window, replay=replay)
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    stub = StubServer(config_from_args(args), host=args.host, port=args.port)
+    redirect = ",".join(f"{h}={b}" for h, b in stub.redirects().items())
+    print(f"Serving on {stub.base_url}\nexport SCORE_REDIRECT='{redirect}'", flush=True)
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,151 @@
+# cache.py
+# Persistent on-disk HTTP response cache (SQLite) with per-endpoint TTLs,
+# ETag / Last-Modified revalidation and size-bounded LRU eviction.
+import re
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+# (url pattern, ttl seconds); first match wins
+DEFAULT_TTLS: Tuple[Tuple[str, int], ...] = (
+    (r"api\.github\.com/repos/[^/]+/[^/]+/commits", 60 * 60),
+    (r"api\.github\.com/repos/[^/]+/[^/]+/contributors", 24 * 60 * 60),
+    (r"api\.github\.com/repos/[^/]+/[^/]+/?(\?|$)", 6 * 60 * 60),
+    (r"github\.com/.+/raw/|raw\.githubusercontent\.com", 24 * 60 * 60),
+    (r"huggingface\.co/api/", 6 * 60 * 60),
+    (r"huggingface\.co/.+/resolve/", 7 * 24 * 60 * 60),
+)
+DEFAULT_TTL = 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Access times of hits are written in batches: once this many are pending
+# or the oldest is this old, before an eviction and on close
+ACCESS_FLUSH_ENTRIES = 256
+ACCESS_FLUSH_SECONDS = 30.0
+
+
+class CacheEntry:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, stored_at: float) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("ETag") or self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("Last-Modified") or self.headers.get("last-modified")
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttls: Tuple[Tuple[str, int], ...] = DEFAULT_TTLS, default_ttl: int = DEFAULT_TTL) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB,"
+            " stored_at REAL, accessed_at REAL, size INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+        # key -> access time not yet written, and when the oldest was recorded
+        self._accessed: Dict[str, float] = {}
+        self._accessed_since = 0.0
+        # Running size of all entries; re-summed before evicting, as other
+        # processes may share the file
+        self._total = self._sum_sizes()
+
+    def ttl_for(self, url: str) -> int:
+        for pattern, ttl in self._ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def is_fresh(self, url: str, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < self.ttl_for(url)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if not self._accessed:
+                self._accessed_since = now
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_ENTRIES or now - self._accessed_since >= ACCESS_FLUSH_SECONDS:
+                self._flush_accessed()
+                self._conn.commit()
+        status, headers, body, stored_at = row
+        return CacheEntry(status, json.loads(headers), bytes(body or b""), stored_at)
+
+    def put(self, key: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        now = time.time()
+        size = len(body) + len(key)
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, status, json.dumps(dict(headers)), sqlite3.Binary(body), now, now, size),
+            )
+            self._accessed.pop(key, None)
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    # Mark a revalidated (304) entry fresh again
+    def touch(self, key: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._accessed.clear()
+            self._total = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
+
+    # Write pending access times in one statement (lock held, caller commits)
+    def _flush_accessed(self) -> None:
+        if self._accessed:
+            self._conn.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                                   [(at, key) for key, at in self._accessed.items()])
+            self._accessed.clear()
+
+    def _sum_sizes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    # Drop least recently used entries until under max_bytes (lock held)
+    def _evict(self) -> None:
+        self._flush_accessed()
+        self._total = self._sum_sizes()
+        if self._total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if self._total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total -= size
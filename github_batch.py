@@ -0,0 +1,114 @@
+# github_batch.py
+# Batch GitHub fetcher: license, stars, forks, pushed_at, last commit date
+# and README for many repositories in a few aliased GraphQL queries
+# instead of several REST calls per model. Results are handed to
+# model.preload, so Models built afterwards skip those REST requests.
+#
+# GraphQL needs a token (GITHUB_TOKEN / GH_TOKEN); without one nothing is
+# fetched and Models fall back to REST. Contributor counts are not exposed
+# by the GraphQL API and still come from REST (Model.get_contrib).
+import os
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import net
+from model import github_readme_target, raw_readme_url, preload
+
+log = logging.getLogger(__name__)
+
+GRAPHQL_URL = os.environ.get("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+BATCH_SIZE = 50
+
+# (owner, repo, ref, README path)
+Target = Tuple[str, str, str, str]
+
+_REPO_FIELDS = """
+    licenseInfo { name spdxId }
+    stargazerCount
+    forkCount
+    pushedAt
+    defaultBranchRef { target { ... on Commit { committedDate } } }
+    readme: object(expression: $%(alias)s_readme) { ... on Blob { text isBinary } }
+"""
+
+
+def _token() -> Optional[str]:
+    return os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+
+
+def build_query(targets: List[Target]) -> Tuple[str, Dict[str, str]]:
+    params, fields, variables = [], [], {}
+    for i, (owner, repo, ref, path) in enumerate(targets):
+        alias = f"r{i}"
+        params += [f"${alias}_owner: String!", f"${alias}_name: String!", f"${alias}_readme: String!"]
+        fields.append(f"  {alias}: repository(owner: ${alias}_owner, name: ${alias}_name) {{"
+                      + _REPO_FIELDS % {"alias": alias} + "  }")
+        variables[f"{alias}_owner"] = owner
+        variables[f"{alias}_name"] = repo
+        variables[f"{alias}_readme"] = f"{ref}:{path}"
+    query = "query(" + ", ".join(params) + ") {\n" + "\n".join(fields) + "\n}"
+    return query, variables
+
+
+# GraphQL repository node -> the subset of the REST /repos payload Model reads
+def _rest_shape(node: Dict[str, Any]) -> Dict[str, Any]:
+    license_info = node.get("licenseInfo") or {}
+    commit = ((node.get("defaultBranchRef") or {}).get("target") or {})
+    return {
+        "license": {"name": license_info.get("name"), "spdx_id": license_info.get("spdxId")} if license_info else None,
+        "stargazers_count": node.get("stargazerCount", 0),
+        "forks_count": node.get("forkCount", 0),
+        "pushed_at": node.get("pushedAt"),
+        "last_commit_date": commit.get("committedDate"),
+    }
+
+
+def fetch_targets(targets: Iterable[Target], batch_size: int = BATCH_SIZE,
+                  token: Optional[str] = None) -> Tuple[Dict[Tuple[str, str], Dict[str, Any]], Dict[str, str]]:
+    token = token or _token()
+    targets = list(dict.fromkeys(targets))
+    repo_info: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    readmes: Dict[str, str] = {}
+    if not token or not targets:
+        return repo_info, readmes
+
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        query, variables = build_query(batch)
+        try:
+            res = net.request("POST", GRAPHQL_URL, json={"query": query, "variables": variables},
+                              headers={"Authorization": f"Bearer {token}"}, timeout=30)
+            if res.status_code != 200:
+                log.warning("GitHub GraphQL returned status %s", res.status_code, extra={"status": res.status_code})
+                continue
+            data = res.json().get("data") or {}
+        except Exception as e:
+            log.warning("Error fetching GitHub batch: %s", e)
+            continue
+
+        for i, target in enumerate(batch):
+            node = data.get(f"r{i}")
+            if not node:
+                # Missing or inaccessible repo: let REST report it
+                continue
+            repo_info[target[:2]] = _rest_shape(node)
+            blob = node.get("readme")
+            if blob is None:
+                readmes[raw_readme_url(target)] = ""
+            elif not blob.get("isBinary") and blob.get("text") is not None:
+                readmes[raw_readme_url(target)] = blob["text"]
+
+    return repo_info, readmes
+
+
+# Collect every GitHub code URL of an input file, fetch them in batches
+# and preload the results for the Models scoring those lines
+def preload_inputs(inputs: Iterable[Dict[str, str]], batch_size: int = BATCH_SIZE) -> int:
+    targets = []
+    for input_dict in inputs:
+        target = github_readme_target(input_dict.get("code_url", ""))
+        if target is not None:
+            targets.append(target)
+    repo_info, readmes = fetch_targets(targets, batch_size=batch_size)
+    preload(repo_info=repo_info, readmes=readmes)
+    return len(repo_info)
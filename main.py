@@ -1,30 +1,225 @@
 #!/usr/bin/env python3
+# Only light modules are imported here: the scoring modules (requests,
+# huggingface_hub) load on the scoring path and pytest in run_tests, so
+# install, --help and usage errors start fast (see bench/startup_bench.py)
+from __future__ import annotations
+
+import os
 import sys
-import subprocess
+import argparse
 import json
-import pytest
-from metrics import Metrics
-from typing import Dict, Any
+import logging
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+    from resources import ResourceStore
+    from state import StateStore
+
+log = logging.getLogger("main")
 
 
 def parse_input(path: str):
     with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            parts = [p.strip() for p in line.split(",")]
-            yield {
-                "code_url": parts[0] if len(parts) > 0 else "",
-                "dataset_url": parts[1] if len(parts) > 1 else "",
-                "model_url": parts[2] if len(parts) > 2 else ""
-            }
+        yield from parse_lines(f)
+
+
+# "code_url,dataset_url,model_url" lines -> input dicts (blank lines skipped)
+def parse_lines(lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+    for line in lines:
+        if not line.strip():
+            continue
+        parts = [p.strip() for p in line.split(",")]
+        yield {
+            "code_url": parts[0] if len(parts) > 0 else "",
+            "dataset_url": parts[1] if len(parts) > 1 else "",
+            "model_url": parts[2] if len(parts) > 2 else ""
+        }
 
 
 def print_ndjson(obj: Dict[str, Any]) -> None:
     print(json.dumps(obj, ensure_ascii=False))
 
 
+# Error record emitted in place of a line that failed to score
+def error_record(input_dict: Dict[str, str], err: Exception) -> Dict[str, Any]:
+    model_url = input_dict.get("model_url", "").rstrip("/").replace("/tree/main", "")
+    return OrderedDict([
+        ("name", model_url.split("/")[-1]),
+        ("category", "MODEL"),
+        ("error", f"{type(err).__name__}: {err}"),
+    ])
+
+
+def score_line(input_dict: Dict[str, str], store: Optional[ResourceStore] = None,
+               state: Optional[StateStore] = None, metrics: Optional[List[str]] = None,
+               deadline: Optional[float] = None, metric_deadline: Optional[float] = None) -> Dict[str, Any]:
+    import stats
+    import tracing
+    from metrics import Metrics
+    try:
+        with tracing.span("score", "line", model=input_dict.get("model_url", "")):
+            # Metrics run on registry's resource DAG: each starts once the
+            # resources it declares are in
+            result = Metrics(input_dict, concurrent=True, store=store, state=state, metrics=metrics,
+                             deadline=deadline, metric_deadline=metric_deadline).run()
+        stats.LINES.inc("ok")
+        return result
+    except Exception as e:
+        log.error("Error scoring %s: %s", input_dict.get("model_url", ""), e,
+                  extra={"url": input_dict.get("model_url", "")}, exc_info=log.isEnabledFor(logging.DEBUG))
+        stats.LINES.inc("error")
+        return error_record(input_dict, e)
+
+
+# Score lines on a worker pool, yielding results in input order
+# (or completion order when ordered=False). At most jobs * 4 lines
+# are in flight so large files are not read into memory up front. A
+# long-lived caller may pass its own pool to keep the threads warm.
+def score_lines(inputs: Iterable[Dict[str, str]], jobs: int = 1, ordered: bool = True,
+                store: Optional[ResourceStore] = None, state: Optional[StateStore] = None,
+                metrics: Optional[List[str]] = None, pool: Optional[ThreadPoolExecutor] = None,
+                deadline: Optional[float] = None, metric_deadline: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    if jobs <= 1:
+        for input_dict in inputs:
+            yield score_line(input_dict, store, state, metrics, deadline, metric_deadline)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+    window = jobs * 4
+    with (nullcontext(pool) if pool is not None else ThreadPoolExecutor(max_workers=jobs)) as pool:
+        pending = deque()
+        for input_dict in inputs:
+            pending.append(pool.submit(score_line, input_dict, store, state, metrics, deadline, metric_deadline))
+            if len(pending) < window:
+                continue
+            if ordered:
+                yield pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    pending.remove(f)
+                    yield f.result()
+
+        if ordered:
+            while pending:
+                yield pending.popleft().result()
+        else:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    pending.remove(f)
+                    yield f.result()
+
+
+# The scoring pipeline for one input file (or daemon job): carry-forward,
+# GitHub batching, prefetching ahead of the scorer, then score_lines.
+# Options are the scoring arguments of build_parser.
+def score_inputs(inputs: Iterable[Dict[str, str]], args: argparse.Namespace,
+                 store: Optional[ResourceStore] = None, state: Optional[StateStore] = None,
+                 pool: Optional[ThreadPoolExecutor] = None) -> Iterator[Dict[str, Any]]:
+    import github_batch
+    import registry
+    import tracing
+    from concurrent.futures import ThreadPoolExecutor
+    from plan import carry_forward, prefetch_ahead
+    from resources import ResourceStore
+    if not args.no_carry_forward:
+        inputs = carry_forward(inputs)
+    # One store for the whole file: lines sharing a repo, model or
+    # dataset share (and coalesce) its fetch
+    if store is None:
+        store = ResourceStore()
+    # The GraphQL batch covers the whole file, so it is read up front
+    if args.github_batch:
+        inputs = list(inputs)
+        with tracing.span("github batch", "plan"):
+            github_batch.preload_inputs(inputs)
+    if args.no_prefetch:
+        yield from score_lines(inputs, jobs=args.jobs, ordered=not args.unordered, store=store, state=state,
+                               metrics=args.metrics, pool=pool, deadline=args.deadline,
+                               metric_deadline=args.metric_deadline)
+        return
+
+    # With a state store only the freshness signals are fetched ahead;
+    # the rest only for metrics that must be recomputed
+    kinds = registry.prefetch_kinds(registry.select(args.metrics))
+    if state:
+        kinds = [k for k in kinds if k in ("metadata", "dataset_metadata", "repo_info")]
+    with (nullcontext(pool) if pool is not None else ThreadPoolExecutor(max_workers=max(args.jobs, 8))) as fetch_pool:
+        inputs = prefetch_ahead(inputs, store, fetch_pool, ahead=max(args.jobs, 1) * 4, kinds=kinds,
+                                deadline=args.deadline)
+        yield from score_lines(inputs, jobs=args.jobs, ordered=not args.unordered, store=store, state=state,
+                               metrics=args.metrics, pool=pool, deadline=args.deadline,
+                               metric_deadline=args.metric_deadline)
+
+
+# --metrics value: comma separated output fields, validated against the registry
+def metric_list(value: str) -> List[str]:
+    fields = [f.strip() for f in value.split(",") if f.strip()]
+    import registry
+    try:
+        registry.select(fields)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return fields
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="./run", usage="./run <install|test|serve|URL_FILE> [options]")
+    parser.add_argument("cmd", help="install, test, serve (scoring daemon), or a file of URL lines")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of lines scored concurrently (default: 1)")
+    parser.add_argument("--unordered", action="store_true",
+                        help="emit results in completion order instead of input order")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="persistent HTTP response cache (SQLite file; default: $SCORE_CACHE)")
+    parser.add_argument("--offline", action="store_true",
+                        help="serve everything from the cache, never touch the network")
+    parser.add_argument("--readme-max-bytes", type=int, metavar="N",
+                        help="stop downloading a README after N bytes (0: no limit; default: 1 MiB)")
+    parser.add_argument("--no-carry-forward", action="store_true",
+                        help="do not let empty code/dataset fields inherit the previous line's")
+    parser.add_argument("--no-prefetch", action="store_true",
+                        help="do not fetch repos/models/datasets for the next lines ahead of scoring")
+    parser.add_argument("--github-batch", action="store_true",
+                        help="prefetch all GitHub repos of the file with batched GraphQL queries (needs GITHUB_TOKEN)")
+    parser.add_argument("--metrics", type=metric_list, metavar="NAMES",
+                        help="only compute these metrics, e.g. license,size_score (net_score needs all of them)")
+    parser.add_argument("--state", metavar="PATH",
+                        help="incremental mode: reuse metric results stored in PATH when their inputs are unchanged")
+    parser.add_argument("--state-max-age", type=float, default=7.0, metavar="DAYS",
+                        help="recompute stored results older than DAYS regardless (default: 7)")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="time budget per line; metrics still fetching when it runs out score 0 and are "
+                             'listed under "partial"')
+    parser.add_argument("--metric-deadline", type=float, metavar="SECONDS",
+                        help="time budget per metric, within the line's")
+    parser.add_argument("--hedge-after", type=float, metavar="SECONDS",
+                        help="send a GET/HEAD again if it has not answered after SECONDS; the first answer wins")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="record spans for HTTP requests, cache lookups, stripping and metrics into FILE")
+    parser.add_argument("--trace-format", choices=("chrome", "json"), default="chrome",
+                        help="chrome trace events (chrome://tracing, Perfetto) or a plain JSON list of spans")
+    parser.add_argument("--metrics-out", metavar="FILE",
+                        help="write request/cache/latency counters in Prometheus text format to FILE at exit")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve the same counters at http://127.0.0.1:PORT/metrics while running")
+    parser.add_argument("--log-level", default="WARNING",
+                        choices=("DEBUG", "INFO", "WARNING", "ERROR"), help="stderr log level")
+    parser.add_argument("--log-format", choices=("text", "json"), default="text",
+                        help="stderr log lines as text or one JSON object per record")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="serve: take jobs from clients of this Unix socket instead of stdin")
+    parser.add_argument("--store-ttl", type=float, default=300.0, metavar="SECONDS",
+                        help="serve: reuse fetched repos/models/datasets across jobs for SECONDS (default: 300)")
+    return parser
+
+
 def run_tests():
+    import pytest
     exit_code = pytest.main([
         "tests",       
         "--cov=.",
@@ -36,13 +231,11 @@ def run_tests():
 
 
 def main(argv: list[str]) -> None:
-    if len(argv) != 2:
-        print("Usage: ./run <install|test|URL_FILE>", file=sys.stderr)
-        sys.exit(2)
-
-    cmd = argv[1]
+    args = build_parser().parse_args(argv[1:])
+    cmd = args.cmd
 
     if cmd == "install":
+        import subprocess
         try:
             subprocess.run(["python3", "-m", "pip", "install", "-r", "dependencies.txt"], check=True)
             sys.exit(0)
@@ -54,15 +247,42 @@ def main(argv: list[str]) -> None:
         run_tests()
 
     else:
+        import logs
+        import net
+        import stats
+        import tracing
+        from model import Model
+        from state import StateStore
+        logs.configure(args.log_level, args.log_format)
+        if args.metrics_port is not None:
+            stats.serve(args.metrics_port)
+        if args.readme_max_bytes is not None:
+            Model.readme_max_bytes = args.readme_max_bytes or None
+        if args.cache or args.offline:
+            net.configure_cache(args.cache or os.environ.get("SCORE_CACHE"), offline=args.offline)
+        if args.hedge_after is not None:
+            net.configure_hedging(args.hedge_after)
+        if args.trace:
+            tracing.enable()
         try:
-            for input_dict in parse_input(cmd):
-                metrics = Metrics(input_dict)
-                result = metrics.run()
+            if cmd == "serve":
+                # Only the daemon needs it
+                import server
+                server.main(args)
+                sys.exit(0)
+            state = StateStore(args.state, max_age=args.state_max_age * 86400) if args.state else None
+            for result in score_inputs(parse_input(cmd), args, state=state):
                 print_ndjson(result)
             sys.exit(0)
         except Exception as e:
-            print(f"Error processing URL file: {e}", file=sys.stderr)
+            log.error("Error processing %s: %s", "jobs" if cmd == "serve" else "URL file", e, extra={"path": cmd})
             sys.exit(1)
+        finally:
+            tracer = tracing.disable()
+            if tracer is not None:
+                tracer.write(args.trace, args.trace_format)
+            if args.metrics_out:
+                stats.write(args.metrics_out)
 
 
 if __name__ == "__main__":
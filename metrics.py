@@ -1,84 +1,163 @@
 # metrics.py
 from __future__ import annotations
 import time
-from typing import Dict
+import net
+import tracing
+import stats
+from typing import Dict, Iterable, Optional
 from model import Model
+from resources import ResourceStore
+from state import StateStore
+import registry
+from readme import RAMP_UP_SECTIONS, PERF_KWS, DATASET_KWS
 from collections import OrderedDict
 
+# License compatible with LGPLv2.1 (substrings of the lowercased license)
+LGPLV21_COMPATIBLE_LICENSES = {
+    "mit",
+    "apache",
+    "lgpl-2.1",
+    "bsd-3-clause",
+    "bsd-2-clause",
+    "mpl"
+}
+
+# Words a ramp-up section needs for full marks
+RAMP_UP_MIN_WORDS = 50
+
+# Device -> model size (GB) at which its size score reaches 0
+SIZE_THRESHOLDS_GB: Dict[str, float] = {
+    "raspberry_pi": 0.5,
+    "jetson_nano": 1.0,
+    "desktop_pc": 6.0,
+    "aws_server": 15.0,
+}
+
+# net_score weights (summed in this order)
+NET_WEIGHTS: Dict[str, float] = {
+    "license": 0.2,
+    "size": 0.1,
+    "ramp": 0.12,
+    "bus": 0.12,
+    "perf": 0.1,
+    "ds_code": 0.1,
+    "ds_quality": 0.13,
+    "code_quality": 0.13
+}
+
 class Metrics:
-    def __init__(self, inputs: Dict[str, str]) -> None:
+    def __init__(self, inputs: Dict[str, str], concurrent: bool = False, max_workers: int = 8,
+                 store: Optional[ResourceStore] = None, state: Optional[StateStore] = None,
+                 metrics: Optional[Iterable[str]] = None, deadline: Optional[float] = None,
+                 metric_deadline: Optional[float] = None) -> None:
         self.mod = Model(
             code_url = inputs.get("code_url", ""),
             dataset_url= inputs.get("dataset_url", ""),
-            model_url= inputs.get("model_url", "")
+            model_url= inputs.get("model_url", ""),
+            store = store
         )
+        # Datasets inherited from earlier lines (see plan.carry_forward)
+        for dataset_url in inputs.get("datasets", []):
+            self.mod.add_dataset(dataset_url)
+        # When the line's fetches began if they were started ahead of run
+        # (see plan.prefetch_ahead); the line and its metrics are timed from then
+        self.started = inputs.get("started")
+        # Incremental mode: reuse stored results of metrics whose inputs are unchanged
+        self.state = state
+        # Output fields to compute (see registry.METRICS); all by default.
+        # net_score is only reported when every metric it weighs is run.
+        self.specs = registry.select(metrics)
+        # Fetch the selected metrics' resources on a pool and run each
+        # metric as soon as its inputs are in (they are I/O bound)
+        self.concurrent = concurrent
+        self.max_workers = max_workers
+        # Seconds the whole line and each metric may take (None: no bound).
+        # A metric cut short scores 0 and is listed under "partial".
+        self.deadline = deadline
+        self.metric_deadline = metric_deadline
+        self.partial: list = []
 
     def _ms(self, seconds: float) -> int:
         return int(round(seconds * 1000.0))
 
+    # Selected metric computations in output order
+    def _tasks(self) -> list:
+        return [spec.task(self) for spec in self.specs]
+
+    # One trace span and latency sample per metric, named after its compute
+    # method. since: when the metric's resource fetches were submitted (on
+    # the DAG it starts only once they are in); the wait is charged to its
+    # latency, as the fetches made inside compute_* are on the serial path.
+    def _traced(self, task, since: Optional[float] = None) -> Dict[str, float]:
+        t0 = time.perf_counter()
+        since = t0 if since is None else since
+        try:
+            with tracing.span(task.__name__, "metric", model=self.mod.model_full_repo), \
+                    net.deadline(self.metric_deadline):
+                if self.state is not None:
+                    result = self.state.run(self.mod, task)
+                else:
+                    result = task()
+        except net.DeadlineExceeded:
+            return self._partial(task, since)
+        finally:
+            stats.METRIC_SECONDS.observe(task.__name__, value=time.perf_counter() - since)
+        waited = self._ms(t0 - since)
+        return {key: value + waited if key.endswith("_latency") else value for key, value in result.items()}
+
+    # Stand-in result of a metric whose deadline ran out (never stored in
+    # the state store: the task raised before state.run could put it)
+    def _partial(self, task, t0: float) -> Dict[str, float]:
+        field = next((spec.field for spec in self.specs if spec.task(self).__name__ == task.__name__),
+                     task.__name__)
+        self.partial.append(field)
+        stats.DEADLINES.inc("metric")
+        score = {dev: 0.0 for dev in SIZE_THRESHOLDS_GB} if field == "size_score" else 0.0
+        return {field: score, f"{field}_latency": self._ms(time.perf_counter() - t0)}
+
     # Runs all metrics computations
     def run(self) -> Dict[str, float]:
-        license_res = self.compute_license()
-        size_res = self.compute_size()
-        ramp_res = self.compute_ramp_up()
-        bus_res = self.compute_bus_factor()
-        perf_res = self.compute_perf_claims()
-        ds_code_res = self.compute_ds_code()
-        ds_quality_res = self.compute_ds_quality()
-        code_quality_res = self.compute_code_quality()
-
-        temp_scores = {}
-        temp_scores.update(license_res)
-        temp_scores.update(size_res)
-        temp_scores.update(ramp_res)
-        temp_scores.update(bus_res)
-        temp_scores.update(perf_res)
-        temp_scores.update(ds_code_res)
-        temp_scores.update(ds_quality_res)
-        temp_scores.update(code_quality_res)
-        net_res = self.compute_net(temp_scores)
+        t0 = self.started if self.started is not None else time.perf_counter()
+        self.partial = []
+
+        with net.deadline(self.deadline):
+            if self.concurrent:
+                # In incremental mode resources are left to the metrics that
+                # actually get recomputed
+                results = registry.run_dag(self.mod, self, self.specs, lambda task: self._traced(task, since=t0),
+                                           max_workers=self.max_workers, fetch=self.state is None)
+            else:
+                results = [self._traced(task) for task in self._tasks()]
+
+        return self._format(results, t0)
+
+    def _format(self, results: list, t0: float) -> Dict[str, float]:
+        scores = {}
+        for res in results:
+            scores.update(res)
 
         format_results = OrderedDict([
             ("name", self.mod.model_dict.get("name")),
             ("category", "MODEL"),
-            ("net_score", net_res["net_score"]),
-            ("net_score_latency", net_res["net_score_latency"]),
-            ("ramp_up_time", ramp_res["ramp_up_time"]),
-            ("ramp_up_time_latency", ramp_res["ramp_up_time_latency"]),
-            ("bus_factor", bus_res["bus_factor"]),
-            ("bus_factor_latency", bus_res["bus_factor_latency"]),
-            ("performance_claims", perf_res["performance_claims"]),
-            ("performance_claims_latency", perf_res["performance_claims_latency"]),
-            ("license", license_res["license"]),
-            ("license_latency", license_res["license_latency"]),
-            ("size_score", size_res["size_score"]),
-            ("size_score_latency", size_res["size_score_latency"]),
-            ("dataset_and_code_score", ds_code_res["dataset_and_code_score"]),
-            ("dataset_and_code_score_latency", ds_code_res["dataset_and_code_score_latency"]),
-            ("dataset_quality", ds_quality_res["dataset_quality"]),
-            ("dataset_quality_latency", ds_quality_res["dataset_quality_latency"]),
-            ("code_quality", code_quality_res["code_quality"]),
-            ("code_quality_latency", code_quality_res["code_quality_latency"]),
-            ]
-        )
+        ])
+        if all(field in scores for field in registry.NET_SCORE_FIELDS):
+            net_res = self.compute_net(scores)
+            format_results["net_score"] = net_res["net_score"]
+            # Net latency is the wall-clock time of the whole run
+            format_results["net_score_latency"] = self._ms(time.perf_counter() - t0)
+        for spec in self.specs:
+            format_results[spec.field] = scores[spec.field]
+            format_results[f"{spec.field}_latency"] = scores[f"{spec.field}_latency"]
+        if self.partial:
+            format_results["partial"] = [spec.field for spec in self.specs if spec.field in self.partial]
 
         return format_results
 
     def compute_license(self) -> Dict[str, float]:
-        # License compatible with LGPLv2.1
-        LGPLV21_COMPATIBLE_LICENSES = {
-            "mit",
-            "apache",
-            "lgpl-2.1",
-            "bsd-3-clause",
-            "bsd-2-clause",
-            "mpl"
-        }
-
-        t0 = time.time()
+        t0 = time.perf_counter()
         license_str = self.mod.get_license().lower()
         license_score = 1.0 if any(l in license_str for l in LGPLV21_COMPATIBLE_LICENSES) else 0.0
-        license_latency = self._ms(time.time() - t0)
+        license_latency = self._ms(time.perf_counter() - t0)
 
         return {
             "license": license_score,
@@ -86,21 +165,14 @@ class Metrics:
         }
 
     def compute_size(self) -> Dict[str, float]:
-        SIZE_THRESHOLDS_GB: Dict[str, float] = {
-            "raspberry_pi": 0.5,
-            "jetson_nano": 1.0,
-            "desktop_pc": 6.0,
-            "aws_server": 15.0,
-        }
-
-        t0 = time.time()
+        t0 = time.perf_counter()
         size_gb = self.mod.get_size()
         size_score = {
             dev: round(min(max(0.0, 1.0 - size_gb / limit), 1.0), 2) if size_gb > 0 else 0.0
             for dev, limit in SIZE_THRESHOLDS_GB.items()
         }
 
-        size_latency = self._ms(time.time() - t0)
+        size_latency = self._ms(time.perf_counter() - t0)
         
         return {
             "size_score": size_score,
@@ -108,40 +180,15 @@ class Metrics:
         }
 
     def compute_ramp_up(self) -> Dict[str, float]:
-        RAMP_UP_SECTIONS = [
-            "install",
-            "installation",
-            "usage",
-            "example",
-            "quickstart",
-            "quick start",
-            "download",
-            "how to use"
+        t0 = time.perf_counter()
+        readme = self.mod.readme_analysis("code")
+        section_scores = [
+            min(readme.section_words(section, RAMP_UP_SECTIONS) / RAMP_UP_MIN_WORDS, 1.0)
+            for section in RAMP_UP_SECTIONS
         ]
-        
-        MIN_WORDS_THRESHOLD = 50
-        t0 = time.time()
-        readme_text = self.mod.fetch_readme("code").lower()
-        section_scores = []
-
-        for section in RAMP_UP_SECTIONS:
-            if section in readme_text:
-                idx = readme_text.index(section) + len(section)
-                after_text = readme_text[idx:]
-                next_idx = len(after_text)
-                for next_section in RAMP_UP_SECTIONS:
-                    ni = after_text.find(next_section)
-                    if ni != -1 and ni < next_idx:
-                        next_idx = ni
-                section_content = after_text[:next_idx].split()
-                meaningful_words = [w for w in section_content if w not in ("more", "information", "see", "docs")]
-                score = min(len(meaningful_words) / MIN_WORDS_THRESHOLD, 1.0)
-                section_scores.append(score)
-            else:
-                section_scores.append(0.0)
 
         ramp_up_score = round(sum(section_scores) / len(section_scores), 2) if section_scores else 0.0
-        ramp_latency = self._ms(time.time() - t0)
+        ramp_latency = self._ms(time.perf_counter() - t0)
 
         return {
             "ramp_up_time": ramp_up_score,
@@ -149,11 +196,10 @@ class Metrics:
         }
     
     def compute_perf_claims(self) -> Dict[str, float]:
-        t0 = time.time()
-        PERF_KWS = ["accuracy", "benchmark", "perplexity", "performance"]
-        readme_text = self.mod.fetch_readme("code").lower()
-        perf_score = 1.0 if any(kw in readme_text for kw in PERF_KWS) else 0.0
-        perf_latency = self._ms(time.time() - t0)
+        t0 = time.perf_counter()
+        readme = self.mod.readme_analysis("code")
+        perf_score = 1.0 if readme.contains_any(PERF_KWS) else 0.0
+        perf_latency = self._ms(time.perf_counter() - t0)
 
         return {
             "performance_claims": perf_score,
@@ -161,7 +207,7 @@ class Metrics:
         }
 
     def compute_bus_factor(self) -> Dict[str, float]:
-        t0 = time.time()
+        t0 = time.perf_counter()
         num_contrib = self.mod.get_contrib()
         if num_contrib >= 10:
             bus_factor_score = 1.0
@@ -172,7 +218,7 @@ class Metrics:
         else:
             bus_factor_score = 0.0
 
-        bus_latency = self._ms(time.time() - t0)
+        bus_latency = self._ms(time.perf_counter() - t0)
 
         return {
             "bus_factor": bus_factor_score,
@@ -180,11 +226,11 @@ class Metrics:
         }
 
     def compute_ds_code(self) -> Dict[str, float]:
-        t0 = time.time()
+        t0 = time.perf_counter()
         has_code = bool(self.mod.code_dict)
         has_ds = bool(self.mod.dataset_dict)
         ds_code_score = (float(has_code) + float(has_ds)) / 2.0
-        ds_code_latency = self._ms(time.time() - t0)
+        ds_code_latency = self._ms(time.perf_counter() - t0)
 
         return {
             "dataset_and_code_score": ds_code_score,
@@ -192,14 +238,14 @@ class Metrics:
         }
     
     def compute_ds_quality(self) -> Dict[str, float]:
-        t0 = time.time()
+        t0 = time.perf_counter()
         ds_readme_len = self.mod.len_readme("dataset")
         if ds_readme_len >= 820:
             ds_readme_point = 0.3
         else:
             ds_readme_point = 0.0
 
-        ds_downloads = self.mod.get_downloads()
+        ds_downloads = self.mod.get_downloads("dataset")
         if ds_downloads >= 100000:
             ds_download_point = 0.2
         elif ds_downloads < 100000 and ds_downloads >= 50000:
@@ -207,11 +253,10 @@ class Metrics:
         else:
             ds_download_point = 0.0
 
-        DATASET_KWS = ["license", "download", "split", "train", "test", "validation"]
         ds_kw_point = 0.5 if self.mod.kw_check(DATASET_KWS, "dataset") else 0.0
 
         ds_quality_score = ds_readme_point + ds_download_point + ds_kw_point
-        ds_quality_latency = self._ms(time.time() - t0)
+        ds_quality_latency = self._ms(time.perf_counter() - t0)
 
         return {
             "dataset_quality": ds_quality_score,
@@ -219,7 +264,7 @@ class Metrics:
         }
 
     def compute_code_quality(self) -> Dict[str, float]:
-        t0 = time.time()
+        t0 = time.perf_counter()
         repo_stats = self.mod.get_git_stats()
         repo_readme_len = self.mod.len_readme("code")
         if repo_stats.get("stars", 0) >= 10000:
@@ -241,7 +286,7 @@ class Metrics:
 
         maintenance_point = 0.2 if self.mod.last_modified("github", 180) else 0.0
         code_quality_score = repo_stats_point + repo_readme_point + maintenance_point
-        code_latency = self._ms(time.time() - t0)
+        code_latency = self._ms(time.perf_counter() - t0)
 
         return {
             "code_quality": code_quality_score,
@@ -250,17 +295,8 @@ class Metrics:
 
         
     def compute_net(self, scores: Dict[str, float]) -> Dict[str, float]:
-        t0 = time.time()
-        weights = {
-            "license": 0.2,
-            "size": 0.1,
-            "ramp": 0.12,
-            "bus": 0.12,
-            "perf": 0.1,
-            "ds_code": 0.1,
-            "ds_quality": 0.13,
-            "code_quality": 0.13
-        }
+        t0 = time.perf_counter()
+        weights = NET_WEIGHTS
         license_score = scores["license"]
         size_score = min(scores["size_score"].values())
         ramp_score = scores["ramp_up_time"]
@@ -282,7 +318,7 @@ class Metrics:
         )
 
         net_score = round(min(net_score, 1.0), 2)
-        net_score_latency = self._ms(time.time() - t0)
+        net_score_latency = self._ms(time.perf_counter() - t0)
 
         return{
             "net_score": net_score,
@@ -1,20 +1,93 @@
-import requests
-import re
-from typing import Optional, Dict
-from huggingface_hub import HfApi, ModelInfo
-from strip import strip_html, strip_markdown
+import net
+import time
+import logging
+import contextvars
+import posixpath
+from urllib.parse import parse_qs, urlsplit
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Optional, Dict
+from huggingface_hub import DatasetInfo, ModelInfo, constants
+from strip import clean_readme
+from readme import ReadmeAnalysis
+from resources import ResourceStore
 from datetime import datetime, timedelta
 
+log = logging.getLogger(__name__)
+
+# Data primed by batch fetchers (see github_batch) and consulted before the
+# network: (owner, repo) -> REST-shaped /repos payload, README URL -> text
+_preloaded_repo_info: Dict[tuple[str, str], Dict[str, Any]] = {}
+_preloaded_readmes: Dict[str, str] = {}
+
+# (owner, repo) -> exact contributor count, shared by every Model
+_contributor_counts: Dict[tuple[str, str], int] = {}
+
+
+def preload(repo_info: Optional[Dict[tuple[str, str], Dict[str, Any]]] = None,
+            readmes: Optional[Dict[str, str]] = None) -> None:
+    _preloaded_repo_info.update(repo_info or {})
+    _preloaded_readmes.update(readmes or {})
+
+
+# Forget everything above, so a long-lived process sees repo changes
+def clear_preloaded() -> None:
+    _preloaded_repo_info.clear()
+    _preloaded_readmes.clear()
+    _contributor_counts.clear()
+
+
+# (owner, repo) for a GitHub URL, or None
+def parse_github_repo(url: str) -> Optional[tuple[str, str]]:
+    if not url or "github.com" not in url:
+        return None
+    path = url.split("github.com/")[-1].strip("/")
+    parts = [p for p in path.split("/") if p]
+    if len(parts) < 2:
+        return None
+    owner, repo = parts[0], parts[1]
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    return owner, repo
+
+
+# (owner, repo, ref, path) of the README a GitHub URL points at: the
+# folder of a tree/<ref>/... or blob/<ref>/... URL, else the default branch
+def github_readme_target(url: str) -> Optional[tuple[str, str, str, str]]:
+    repo = parse_github_repo(url)
+    if repo is None:
+        return None
+    parts = [p for p in url.split("github.com/")[-1].strip("/").split("/") if p]
+    ref, folder = "HEAD", []
+    if len(parts) >= 4 and parts[2] in ("tree", "blob"):
+        ref, folder = parts[3], parts[4:]
+        if parts[2] == "blob":
+            folder = folder[:-1]
+    path = "/".join(folder + ["README.md"])
+    return repo[0], repo[1], ref, path
+
+
+def raw_readme_url(target: tuple[str, str, str, str]) -> str:
+    owner, repo, ref, path = target
+    return f"https://github.com/{owner}/{repo}/raw/{ref}/{path}"
+
+
+def github_readme_url(url: str) -> str:
+    return raw_readme_url(github_readme_target(url))
+
+
 class Model:
-    def __init__(self, code_url: str, dataset_url:str , model_url:str):
+    # Download cap for README files; None reads them whole. Scores saturate
+    # long before this (1700 words for code quality), so huge generated
+    # READMEs only cost transfer and memory past it.
+    readme_max_bytes: Optional[int] = 1024 * 1024
+
+    def __init__(self, code_url: str, dataset_url:str , model_url:str, store: Optional[ResourceStore] = None):
         self.code_url: str = code_url
         self.dataset_url: str = dataset_url
         self.model_url: str = model_url
         self.model_name: str = self.get_name(model_url, "model")
 
         self.file_size_types: tuple[str, ...] = (".bin", ".safetensors")
-        self.metadata: Optional[ModelInfo] = None
-        self.api = HfApi()
 
         self.code_dict: Dict[str, str] = {
             "name": self.get_name(code_url, "code"),
@@ -32,11 +105,51 @@ class Model:
             "url": self.model_url,
             "type": "model"}
 
+        # Resources loaded once and shared by all metrics, e.g.
+        # ("readme", url_type, url) -> {"raw": ..., "clean": ...}. Models
+        # given the same store also share (and coalesce) their fetches.
+        self.store: ResourceStore = store if store is not None else ResourceStore()
+
+        # Hub id of an HF dataset URL ("" for external datasets)
+        self.dataset_full_repo: str = self.dataset_dict["name"][0] if "huggingface.co" in dataset_url else ""
+
         self.datasets: list[str] = []
         if dataset_url:
             self.add_dataset(dataset_url)
 
-        self.fetch_metadata()
+    # HF model info, loaded on first access (no network in the constructor)
+    @property
+    def metadata(self) -> Optional[ModelInfo]:
+        return self._once(("metadata", self.model_full_repo), self._load_metadata)
+
+    @metadata.setter
+    def metadata(self, value: Optional[ModelInfo]) -> None:
+        self.store.set(("metadata", self.model_full_repo), value)
+
+    # HF dataset info (downloads, card data, ...), loaded on first access
+    @property
+    def dataset_metadata(self) -> Optional[DatasetInfo]:
+        return self._once(("dataset_metadata", self.dataset_full_repo), self._load_dataset_metadata)
+
+    # GitHub repo payload, loaded on first access
+    @property
+    def repo_info(self) -> Dict[str, Any]:
+        return self.get_repo_info()
+
+    # Store key -> callable warming it, for every lazily loaded resource of
+    # this model (keys let prefetch skip resources shared between models)
+    def prefetch_tasks(self) -> Dict[tuple, Callable[[], Any]]:
+        tasks: Dict[tuple, Callable[[], Any]] = {
+            ("metadata", self.model_full_repo): lambda: self.metadata,
+            ("dataset_metadata", self.dataset_full_repo): lambda: self.dataset_metadata,
+            ("readme",) + self._readme_key("code"): lambda: self.get_readme("code"),
+            ("readme",) + self._readme_key("dataset"): lambda: self.get_readme("dataset"),
+        }
+        repo = self.github_repo()
+        if repo is not None:
+            tasks[("repo_info",) + repo] = self.get_repo_info
+            tasks[("contributors",) + repo] = self.get_contrib
+        return tasks
 
     # Extract name from URL
     def get_name(self, url: str, type: str) -> tuple[str, str]:
@@ -62,54 +175,174 @@ class Model:
 
         return "unknown"
 
-    # HF API fetch
+    # HF API fetch (same endpoint as HfApi.model_info, but through the
+    # shared session and response cache). blobs=true adds per-file sizes.
     def fetch_metadata(self) -> None:
+        self.metadata = self._load_metadata()
+
+    def _load_metadata(self) -> Optional[ModelInfo]:
+        if not self.model_full_repo:
+            return None
         try:
-            self.metadata = self.api.model_info(self.model_full_repo)
+            res = net.get(f"{constants.ENDPOINT}/api/models/{self.model_full_repo}",
+                          params={"blobs": "true"}, timeout=10)
+            res.raise_for_status()
+            return ModelInfo(**res.json())
         except Exception as e:
-            print(f"Error fetching metadata for {self.model_name}: {e}")
-            self.metadata = None
+            log.warning("Error fetching metadata for %s: %s", self.model_full_repo, e,
+                        extra={"resource": "metadata", "repo": self.model_full_repo})
+            return None
+
+    # Same endpoint as HfApi.dataset_info, through the shared session/cache
+    def _load_dataset_metadata(self) -> Optional[DatasetInfo]:
+        if not self.dataset_full_repo:
+            return None
+        try:
+            res = net.get(f"{constants.ENDPOINT}/api/datasets/{self.dataset_full_repo}", timeout=10)
+            res.raise_for_status()
+            return DatasetInfo(**res.json())
+        except Exception as e:
+            log.warning("Error fetching dataset metadata for %s: %s", self.dataset_full_repo, e,
+                        extra={"resource": "dataset_metadata", "repo": self.dataset_full_repo})
+            return None
 
     # README raw text data
     def fetch_readme(self, url_type: str) -> str:
-        readme_text = ""
-        readme_url = ""
+        return self.get_readme(url_type)["clean"]
 
+    def _url_for(self, url_type: str) -> str:
         url_map = {
             "code": self.code_url,
             "dataset": self.dataset_url,
             "model": self.model_url,
         }
+        return url_map.get(url_type) or ""
+
+    # Store key for a README: GitHub and HF dataset READMEs depend only on
+    # the URL, Hub model ones are read from this model's card data
+    def _readme_key(self, url_type: str) -> tuple:
+        url = self._url_for(url_type)
+        if parse_github_repo(url) or (url_type == "dataset" and self.dataset_full_repo):
+            return (url_type, url)
+        return (url_type, url, self.model_full_repo)
+
+    # Cached README entry, fetched and stripped once per (url_type, url)
+    def get_readme(self, url_type: str) -> Dict[str, Any]:
+        url = self._url_for(url_type)
+        return self._once(("readme",) + self._readme_key(url_type), lambda: self._load_readme(url_type, url))
+
+    # Keyword/section/word-count analysis of the cleaned README, built once
+    # and shared by every README-based metric
+    def readme_analysis(self, url_type: str) -> ReadmeAnalysis:
+        return self._once(("readme_analysis",) + self._readme_key(url_type),
+                          lambda: ReadmeAnalysis(self.fetch_readme(url_type)))
+
+    # Load a resource once through the store; concurrent callers for the
+    # same key wait for the first one instead of repeating the request
+    def _once(self, key: tuple, loader: Callable[[], Any]) -> Any:
+        return self.store.get(key, loader)
+
+    # (owner, repo) for a GitHub code URL, or None
+    def github_repo(self) -> Optional[tuple[str, str]]:
+        return parse_github_repo(self.code_url)
+
+    # GitHub /repos/{owner}/{repo} payload, fetched once per code URL and
+    # shared by license, stars/forks and last-modified checks
+    def get_repo_info(self) -> Dict[str, Any]:
+        repo = self.github_repo()
+        if repo is None:
+            return {}
+        return self._once(("repo_info",) + repo, lambda: self._load_repo_info(*repo))
+
+    def dataset_github_repo(self) -> Optional[tuple[str, str]]:
+        return parse_github_repo(self.dataset_url)
+
+    # The same payload for a dataset hosted on GitHub (its pushed_at tells
+    # when the dataset changed); shared with the code repo if they match
+    def get_dataset_repo_info(self) -> Dict[str, Any]:
+        repo = self.dataset_github_repo()
+        if repo is None:
+            return {}
+        return self._once(("repo_info",) + repo, lambda: self._load_repo_info(*repo))
+
+    def _load_repo_info(self, owner: str, repo: str) -> Dict[str, Any]:
+        if (owner, repo) in _preloaded_repo_info:
+            return _preloaded_repo_info[(owner, repo)]
+        try:
+            api_url = f"https://api.github.com/repos/{owner}/{repo}"
+            res = net.get(api_url, timeout=10)
+            if res.status_code == 200:
+                return res.json()
+            log.warning("GitHub API returned status %s for %s/%s", res.status_code, owner, repo,
+                        extra={"resource": "repo_info", "repo": f"{owner}/{repo}", "status": res.status_code})
+        except Exception as e:
+            log.warning("Error fetching GitHub repo info for %s/%s: %s", owner, repo, e,
+                        extra={"resource": "repo_info", "repo": f"{owner}/{repo}"})
+        return {}
+
+    def _load_readme(self, url_type: str, url: str) -> Dict[str, Any]:
+        readme_text = ""
+        readme_url = ""
 
-        url = url_map.get(url_type)
         if not url:
-            return ""
+            return {"raw": "", "clean": ""}
+
+        if url_type == "dataset" and self.dataset_full_repo:
+            return self._load_dataset_readme()
 
-        if url_type in ["model", "dataset"] and "huggingface.co" in url:
+        if url_type == "model" and "huggingface.co" in url:
             if self.metadata and getattr(self.metadata, "cardData", None):
                 readme_text = self.metadata.cardData.get("readme", "")
                 if readme_text:
                     # Strip HTML/Markdown
-                    clean_text = strip_html(readme_text)
-                    clean_text = strip_markdown(clean_text)
-                    return clean_text
+                    clean_text = clean_readme(readme_text)
+                    return {"raw": readme_text, "clean": clean_text}
         
-        if "github.com" in url:
-            readme_url = url.replace("tree/main", "raw/main/README.md")
+        if parse_github_repo(url):
+            readme_url = github_readme_url(url)
+            if readme_url in _preloaded_readmes:
+                readme_text = _preloaded_readmes[readme_url]
+                return {"raw": readme_text, "clean": clean_readme(readme_text)}
         else:
             # External dataset / other sites
             readme_text = "External"
-            return readme_text
+            return {"raw": readme_text, "clean": readme_text}
 
         try:
-            res = requests.get(readme_url, timeout=10)
-            readme_text = res.text
-            clean_text = strip_html(readme_text)
-            clean_text = strip_markdown(clean_text)
-            return clean_text
+            res = net.get(readme_url, timeout=10, max_bytes=self.readme_max_bytes)
+            return self._read_readme(res)
+        except Exception as e:
+            log.warning("Error fetching readme %s: %s", readme_url, e, extra={"resource": "readme", "url": readme_url})
+            return {"raw": "", "clean": ""}
+
+    # Dataset card from the Hub. Without a README the card fields from
+    # the dataset info (license, task categories, splits, ...) stand in.
+    def _load_dataset_readme(self) -> Dict[str, Any]:
+        readme_url = f"{constants.ENDPOINT}/datasets/{self.dataset_full_repo}/raw/main/README.md"
+        try:
+            res = net.get(readme_url, timeout=10, max_bytes=self.readme_max_bytes)
+            if res.status_code == 200:
+                return self._read_readme(res)
         except Exception as e:
-            print(f"Error fetching readme: {e}")
-            return ""
+            log.warning("Error fetching dataset readme %s: %s", readme_url, e,
+                        extra={"resource": "readme", "url": readme_url})
+
+        card_data = getattr(self.dataset_metadata, "card_data", None)
+        if card_data:
+            card_text = card_data.to_yaml()
+            return {"raw": card_text, "clean": clean_readme(card_text)}
+        return {"raw": "", "clean": ""}
+
+    # Decode and strip a README response. net has already stopped the
+    # download at readme_max_bytes, so the body is cleaned in one pass.
+    def _read_readme(self, res: Any) -> Dict[str, Any]:
+        res.encoding = res.encoding or "utf-8"
+        text = res.text
+        return {
+            "raw": text,
+            "clean": clean_readme(text),
+            "truncated": getattr(res, "truncated", False),
+        }
 
     # Model licenses
     def get_license(self) -> str:
@@ -121,57 +354,64 @@ class Model:
                 return license_name
 
         # Fall back to GitHub API if code_url is a repo
-        if self.code_url and "github.com" in self.code_url:
-            try:
-                repo_url = self.code_url.replace("tree/main", "").rstrip("/")
-                parts = repo_url.split("/")
-                owner, repo = parts[-2], parts[-1]
-                api_url = f"https://api.github.com/repos/{owner}/{repo}"
-                res = requests.get(api_url, timeout=10)
-                if res.status_code == 200:
-                    data = res.json()
-                    return data.get("license", {}).get("name", "Unknown")
-            except Exception as e:
-                print(f"Error fetching GitHub license: {e}")
+        info = self.get_repo_info()
+        if info:
+            return (info.get("license") or {}).get("name") or "Unknown"
 
         return "Unknown"
 
-    # Size of model
+    # Size of model in GB, computed once per model repo
     def get_size(self) -> float:
-        total_bytes = 0
-        for f in getattr(self.metadata, "siblings", []):
+        return self._once(("size", self.model_full_repo), self._load_size)
+
+    def _load_size(self) -> float:
+        weights = self.weight_files()
+        total_bytes = sum(size for size in weights.values() if size)
+
+        # Sizes missing from the listing fall back to concurrent HEAD requests,
+        # each in a copy of this context so they keep the caller's deadline
+        missing = [name for name, size in weights.items() if not size]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(8, len(missing))) as pool:
+                futures = [pool.submit(contextvars.copy_context().run, self._head_size, name) for name in missing]
+                total_bytes += sum(f.result() for f in futures)
+
+        return total_bytes / (1024**3)
+
+    # Weight files -> size in bytes (None if unknown). .bin copies are
+    # skipped in any folder that also ships .safetensors of the same weights.
+    def weight_files(self) -> Dict[str, Optional[int]]:
+        files: Dict[str, Optional[int]] = {}
+        for f in getattr(self.metadata, "siblings", None) or []:
             filename = getattr(f, "rfilename", "")
             if filename.endswith(self.file_size_types):
-                file_url = f"{self.model_url}/resolve/main/{filename}"
-                try:
-                    res = requests.head(file_url, timeout=15, allow_redirects=True)
-                    size = int(res.headers.get("Content-Length", 0) or 0)
-                    total_bytes += size
-                except Exception as e:
-                    print(f"Error fetching size for {filename}: {e}")
+                files[filename] = getattr(f, "size", None)
 
-        return total_bytes / (1024**3)
+        safetensor_dirs = {posixpath.dirname(name) for name in files if name.endswith(".safetensors")}
+        return {
+            name: size for name, size in files.items()
+            if not (name.endswith(".bin") and posixpath.dirname(name) in safetensor_dirs)
+        }
+
+    def _head_size(self, filename: str) -> int:
+        file_url = f"{constants.ENDPOINT}/{self.model_full_repo}/resolve/main/{filename}"
+        try:
+            res = net.head(file_url, timeout=15, allow_redirects=True)
+            return int(res.headers.get("Content-Length", 0) or 0)
+        except Exception as e:
+            log.warning("Error fetching size for %s: %s", file_url, e, extra={"resource": "size", "url": file_url})
+            return 0
 
     # Check README for keywords
     def kw_check(self, kw: list[str], readme_type: str) -> bool:
-        text = self.fetch_readme(readme_type).lower()
-        if not text.strip() or text == "External":
+        analysis = self.readme_analysis(readme_type)
+        if analysis.external or not analysis.word_count:
             return False
-        
-        for k in kw:
-            word = r"\b" + re.escape(k.lower()) + r"\b"
-            if re.search(word, text):
-                return True
-            
-        return False
+        return analysis.has_word(kw)
     
     # Number of words in README
     def len_readme(self, readme_type: str) -> int:
-        text = self.fetch_readme(readme_type)
-        if not text or text == "External":
-            return 0
-        
-        return len(text.split())
+        return self.readme_analysis(readme_type).word_count
 
     # Add dataset url to list for tracking
     def add_dataset(self, dataset_url: str) -> None:
@@ -183,19 +423,23 @@ class Model:
         if type == "huggingface":
             if not self.metadata or not getattr(self.metadata, "lastModified", None):
                 return False
-            date = datetime.fromisoformat(self.metadata.lastModified.replace("Z", "+00:00"))
+            date = self._parse_date(self.metadata.lastModified)
             return datetime.now(date.tzinfo) - date < timedelta(days = days)
         elif type == "github":
-            if not self.code_url or "github.com" not in self.code_url:
+            if self.github_repo() is None:
                 return False
 
+            # pushed_at from the shared repo payload saves a /commits call
+            pushed_at = self.get_repo_info().get("pushed_at")
+            if pushed_at:
+                date = self._parse_date(pushed_at)
+                return datetime.now(date.tzinfo) - date < timedelta(days = days)
+
             try:
-                parts = self.code_url.rstrip("/").split("/")
-                owner = parts[-2]
-                repo = parts[-1]
+                owner, repo = self.github_repo()
                 api_url = f"https://api.github.com/repos/{owner}/{repo}/commits?per_page=1"
 
-                res = requests.get(api_url, timeout = 10)
+                res = net.get(api_url, timeout = 10)
                 if res.status_code != 200:
                     return False
 
@@ -203,68 +447,124 @@ class Model:
                 if not data:
                     return False
 
-                last_commit_date = datetime.fromisoformat(data[0]["commit"]["committer"]["date"].replace("Z", "+00:00"))
+                last_commit_date = self._parse_date(data[0]["commit"]["committer"]["date"])
                 return datetime.now(last_commit_date.tzinfo) - last_commit_date < timedelta(days = days)
             except Exception as e:
-                print(f"Error checking GitHub last modified: {e}")
+                log.warning("Error checking GitHub last modified: %s", e,
+                            extra={"resource": "commits", "repo": "/".join(self.github_repo())})
                 return False
+        return False
+
+    # ISO timestamps arrive as strings from GitHub and as datetimes from huggingface_hub
+    def _parse_date(self, value: Any) -> datetime:
+        if isinstance(value, datetime):
+            return value
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
         
-    # Get num of downloads
-    def get_downloads(self) -> int:
+    # Get num of downloads of the model, or of the dataset with type="dataset"
+    def get_downloads(self, type: str = "model") -> int:
         try:
-            down = getattr(self.metadata, "downloads", 0)
+            info = self.dataset_metadata if type == "dataset" else self.metadata
+            down = getattr(info, "downloads", 0) or 0
             return down
         except Exception as e:
-            print(f"Error fetching downloads: {e}")
+            log.warning("Error fetching downloads: %s", e, extra={"resource": "downloads"})
             return 0
             
     # Get num of contributors
     def get_contrib(self) -> int:
-        if not self.code_url or "github.com" not in self.code_url:
+        repo = self.github_repo()
+        if repo is None:
             return 0
-        try:
-            parts = self.code_url.rstrip("/").split("/")
-            owner = parts[-2]
-            repo = parts[-1]
-            api_url = f"https://api.github.com/repos/{owner}/{repo}/contributors?per_page=100"
+        return self._once(("contributors",) + repo, lambda: self._load_contrib(*repo))
 
-            res = requests.get(api_url, timeout=10)
+    # Exact count without downloading the list: with per_page=1 the page
+    # number of the Link rel="last" URL is the number of contributors
+    def _load_contrib(self, owner: str, repo: str) -> int:
+        if (owner, repo) in _contributor_counts:
+            return _contributor_counts[(owner, repo)]
+        try:
+            api_url = f"https://api.github.com/repos/{owner}/{repo}/contributors"
+            res = net.get(api_url, params={"per_page": 1}, timeout=10)
             if res.status_code != 200:
                 return 0
 
-            data = res.json()
-            return len(data)
+            last_url = res.links.get("last", {}).get("url")
+            if last_url:
+                count = int(parse_qs(urlsplit(last_url).query)["page"][0])
+            else:
+                count = len(res.json())
+            _contributor_counts[(owner, repo)] = count
+            return count
         except Exception as e:
-            print(f"Error fetching contributors: {e}")
+            log.warning("Error fetching contributors for %s/%s: %s", owner, repo, e,
+                        extra={"resource": "contributors", "repo": f"{owner}/{repo}"})
             return 0
 
     # Get stats for GitHub stars and forks through GitHub API
     def get_git_stats(self) -> Dict[str, int]:
-        if not self.code_url or "github.com" not in self.code_url:
-            return {"stars": 0, "forks": 0}
-
-        try:
-            repo_url = self.code_url.replace("tree/main", "").replace("blob/main", "").rstrip("/")
-            parts = repo_url.split("/")
-            if len(parts) < 5:
-                print(f"Invalid GitHub URL: {repo_url}")
-                return {"stars": 0, "forks": 0}
+        info = self.get_repo_info()
+        return {
+            "stars": info.get("stargazers_count", 0),
+            "forks": info.get("forks_count", 0)
+        }
 
-            owner, repo = parts[-2], parts[-1]
 
-            api_url = f"https://api.github.com/repos/{owner}/{repo}"
-            res = requests.get(api_url, timeout = 10)
-
-            if res.status_code == 200:
-                data = res.json()
-                return {
-                    "stars": data.get("stargazers_count", 0),
-                    "forks": data.get("forks_count", 0)
-                }
-            else:
-                print(f"GitHub API returned status {res.status_code}")
-                return {"stars": 0, "forks": 0}
-
-        except Exception as e:
-            print(f"Error fetching GitHub stats: {e}")
-            return {"stars": 0, "forks": 0}
\ No newline at end of file
+# Prefetch kind of a store key: its first element, with the URL type for
+# READMEs so code and dataset READMEs can be prefetched separately
+def prefetch_kind(key: tuple) -> Any:
+    return key[:2] if key[0] == "readme" else key[0]
+
+
+# Prefetch tasks of models: one per (store, key) not in seen yet, only of
+# the given kinds if set (see prefetch_kind). seen is updated.
+def _prefetch_tasks(models: Iterable[Model], kinds: Optional[Iterable[Any]], seen: set) -> list[Callable[[], Any]]:
+    kinds = set(kinds) if kinds is not None else None
+    tasks: list[Callable[[], Any]] = []
+    for mod in models:
+        for key, task in mod.prefetch_tasks().items():
+            if kinds is not None and prefetch_kind(key) not in kinds:
+                continue
+            if (id(mod.store), key) not in seen:
+                seen.add((id(mod.store), key))
+                tasks.append(task)
+    return tasks
+
+
+# Run a prefetch task within deadline seconds; one that runs out is left
+# to the metric reading the resource. began, if given, gets its start time.
+def _run_prefetch(task: Callable[[], Any], deadline: Optional[float], began: Optional[list] = None) -> None:
+    if began is not None:
+        began.append(time.perf_counter())
+    try:
+        with net.deadline(deadline):
+            task()
+    except net.DeadlineExceeded:
+        pass
+
+
+# Warm many models at once: every resource of every model is fetched on a
+# shared pool, so later metric calls hit the cache. Resources shared by
+# models using one store (same key) are fetched once. kinds limits the
+# prefetch to those resource kinds (see prefetch_kind); pool, if given,
+# is used instead of a new executor. Each fetch gets deadline seconds.
+def prefetch(models: Iterable[Model], max_workers: int = 16, kinds: Optional[Iterable[Any]] = None,
+             pool: Optional[ThreadPoolExecutor] = None, deadline: Optional[float] = None) -> None:
+    tasks = _prefetch_tasks(models, kinds, set())
+    if not tasks:
+        return
+    if pool is not None:
+        list(pool.map(lambda task: _run_prefetch(task, deadline), tasks))
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+        list(pool.map(lambda task: _run_prefetch(task, deadline), tasks))
+
+
+# Non-blocking prefetch on pool for callers feeding models in as they go
+# (see plan.prefetch_ahead); keys in seen are skipped, and seen is updated.
+# began, if given, gets the time each task starts running.
+def submit_prefetch(models: Iterable[Model], pool: ThreadPoolExecutor, kinds: Optional[Iterable[Any]] = None,
+                    deadline: Optional[float] = None, seen: Optional[set] = None,
+                    began: Optional[list] = None) -> list[Future]:
+    tasks = _prefetch_tasks(models, kinds, seen if seen is not None else set())
+    return [pool.submit(_run_prefetch, task, deadline, began) for task in tasks]
@@ -0,0 +1,513 @@
+# net.py
+# Shared HTTP layer: one process-wide requests.Session with keep-alive,
+# bounded connections per host, transient-error retries, GitHub
+# rate-limit awareness and an optional persistent response cache.
+# Requests made under deadline() get at most the time left of it, and
+# idempotent requests can be hedged (sent again when slow, first wins).
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+from cache import ResponseCache, CacheEntry, DEFAULT_MAX_BYTES
+import tracing
+import stats
+
+POOL_HOSTS = 16           # number of per-host pools kept alive
+POOL_MAXSIZE = 32         # connections per host
+MAX_RATE_LIMIT_WAIT = 60  # seconds we are willing to sleep for a rate limit
+MAX_RATE_LIMIT_RETRIES = 3
+
+GITHUB_HOSTS = ("api.github.com", "github.com", "raw.githubusercontent.com")
+HF_HOSTS = ("huggingface.co",)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# Persistent response cache; configured from SCORE_CACHE / SCORE_OFFLINE
+# on first use unless configure_cache() is called
+_cache: Optional[ResponseCache] = None
+_cache_configured = False
+_offline = False
+_cache_lock = threading.Lock()
+
+# host -> base URL requests for that host are sent to instead (e.g. a local
+# stub server); configured from SCORE_REDIRECT unless redirect_hosts() is called
+_redirects: Dict[str, str] = {}
+_redirects_configured = False
+_redirects_lock = threading.Lock()
+
+# host -> epoch seconds until which requests should wait (rate limit exhausted)
+_blocked_until: Dict[str, float] = {}
+_blocked_lock = threading.Lock()
+
+# time.monotonic() by which the current model/metric must be done (see
+# deadline); follows the context into worker threads that copy it
+_deadline: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar("deadline")
+
+# Hedging: seconds after which a GET/HEAD still without an answer is sent
+# a second time (None: off), and the pool the copies run on
+_hedge_after: Optional[float] = None
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_lock = threading.Lock()
+MAX_HEDGE_IN_FLIGHT = 64
+
+
+# Raised when a request is started, or times out, after the deadline.
+# Like asyncio.CancelledError it is a BaseException: the loaders' `except
+# Exception` fallbacks must not turn a cut fetch into a value that is
+# then memoized for every other line.
+class DeadlineExceeded(BaseException):
+    pass
+
+
+# urllib3 retries that give up once the current deadline has passed and
+# never back off beyond it (increment runs in the requesting thread)
+class _DeadlineRetry(Retry):
+    def increment(self, method: Optional[str] = None, url: Optional[str] = None, *args, **kwargs) -> Retry:
+        if _expired():
+            raise MaxRetryError(kwargs.get("_pool"), url, kwargs.get("error"))
+        return super().increment(method, url, *args, **kwargs)
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        left = time_left()
+        return backoff if left is None else min(backoff, max(left, 0.0))
+
+
+def _build_session() -> requests.Session:
+    retry = _DeadlineRetry(
+        total=3,
+        connect=3,
+        read=2,
+        status=2,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE,
+                          max_retries=retry, pool_block=True)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+# Drop the shared session (e.g. after changing pool sizes)
+def reset_session() -> None:
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+    with _blocked_lock:
+        _blocked_until.clear()
+
+
+# Enable (path) or disable (None) the on-disk cache. offline=True never
+# touches the network and serves cached responses regardless of age.
+def configure_cache(path: Optional[str], offline: bool = False, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+    global _cache, _cache_configured, _offline
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = ResponseCache(path, max_bytes=max_bytes) if path else None
+        _offline = offline
+        _cache_configured = True
+
+
+def get_cache() -> Optional[ResponseCache]:
+    global _cache, _cache_configured, _offline
+    with _cache_lock:
+        if not _cache_configured:
+            path = os.environ.get("SCORE_CACHE")
+            _cache = ResponseCache(path) if path else None
+            _offline = os.environ.get("SCORE_OFFLINE", "") not in ("", "0")
+            _cache_configured = True
+        return _cache
+
+
+# Send requests for the given hosts to other base URLs, e.g.
+# {"api.github.com": "http://127.0.0.1:8000/api.github.com"}. Cache keys,
+# auth and rate-limit bookkeeping keep using the original host.
+def redirect_hosts(mapping: Optional[Dict[str, str]]) -> None:
+    global _redirects_configured
+    with _redirects_lock:
+        _redirects.clear()
+        _redirects.update({host: base.rstrip("/") for host, base in (mapping or {}).items()})
+        _redirects_configured = True
+
+
+# SCORE_REDIRECT="host=base,host=base"
+def _redirect_map() -> Dict[str, str]:
+    global _redirects_configured
+    with _redirects_lock:
+        if not _redirects_configured:
+            for pair in os.environ.get("SCORE_REDIRECT", "").split(","):
+                host, sep, base = pair.strip().partition("=")
+                if sep:
+                    _redirects[host] = base.rstrip("/")
+            _redirects_configured = True
+        return _redirects
+
+
+def _redirected(url: str) -> str:
+    redirects = _redirect_map()
+    if not redirects:
+        return url
+    parts = urlsplit(url)
+    base = redirects.get(parts.hostname or "")
+    if base is None:
+        return url
+    rest = url[len(f"{parts.scheme}://{parts.netloc}"):]
+    return base + rest
+
+
+# Bound everything inside to seconds from now (nested deadlines keep the
+# earlier one); None leaves the current deadline as is
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get(None)
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+# Seconds left before the current deadline, or None without one
+def time_left() -> Optional[float]:
+    at = _deadline.get(None)
+    return None if at is None else at - time.monotonic()
+
+
+def _expired() -> bool:
+    left = time_left()
+    return left is not None and left <= 0
+
+
+def _check_deadline(host: str, url: str, needed: float = 0.0) -> Optional[float]:
+    left = time_left()
+    if left is not None and left <= needed:
+        stats.DEADLINES.inc("request")
+        raise DeadlineExceeded(f"Deadline reached before {url}")
+    return left
+
+
+# requests timeout (seconds or a (connect, read) pair) capped at left
+def _clamp_timeout(timeout: Any, left: Optional[float]) -> Any:
+    if left is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        return tuple(left if t is None else min(t, left) for t in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+def configure_hedging(after: Optional[float]) -> None:
+    global _hedge_after
+    _hedge_after = after
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _hedge_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=MAX_HEDGE_IN_FLIGHT, thread_name_prefix="net-hedge")
+        return _hedge_executor
+
+
+def _close_response(future: Future) -> None:
+    if future.exception() is None:
+        future.result().close()
+
+
+# _timed_request, sent again if no answer came within _hedge_after; the
+# first successful answer wins and the other is closed when it arrives
+def _hedged(host: str, method: str, url: str, headers: Dict[str, str], **kwargs) -> requests.Response:
+    pool = _hedge_pool()
+
+    def attempt() -> Future:
+        return pool.submit(contextvars.copy_context().run, _timed_request, host, method, url, headers, **kwargs)
+
+    first = attempt()
+    done, _ = wait([first], timeout=_hedge_after)
+    if done:
+        return first.result()
+    stats.HTTP_HEDGES.inc(host, "sent")
+    hedge = attempt()
+    pending = {first, hedge}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+                continue
+            for other in pending:
+                other.add_done_callback(_close_response)
+            if future is hedge:
+                stats.HTTP_HEDGES.inc(host, "won")
+            return future.result()
+    raise error
+
+
+# Optional token auth from GITHUB_TOKEN / HF_TOKEN
+def _auth_headers(host: str) -> Dict[str, str]:
+    if host in GITHUB_HOSTS:
+        token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+    elif host in HF_HOSTS:
+        token = os.environ.get("HF_TOKEN")
+    else:
+        token = None
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+# Seconds to wait before retrying a rate-limited response, or None if the
+# response is not a (recoverable) rate limit
+def _rate_limit_wait(res: requests.Response, attempt: int) -> Optional[float]:
+    if res.status_code not in (403, 429):
+        return None
+
+    retry_after = res.headers.get("Retry-After")
+    if retry_after:
+        try:
+            wait = float(retry_after)
+        except ValueError:
+            wait = 2.0 ** attempt
+    elif res.headers.get("X-RateLimit-Remaining") == "0":
+        reset = float(res.headers.get("X-RateLimit-Reset", 0) or 0)
+        wait = reset - time.time()
+    elif res.status_code == 429:
+        wait = 2.0 ** attempt
+    else:
+        # Plain 403: forbidden, not throttled
+        return None
+
+    if wait > MAX_RATE_LIMIT_WAIT:
+        return None
+    return max(wait, 0.0) + 0.5
+
+
+# Remember an exhausted quota, however far off its reset, so other threads
+# wait for it (or fail fast) instead of burning 403s
+def _note_rate_limit(host: str, res: requests.Response) -> None:
+    if res.headers.get("X-RateLimit-Remaining") != "0":
+        return
+    try:
+        reset = float(res.headers.get("X-RateLimit-Reset", 0) or 0)
+    except ValueError:
+        return
+    if reset > time.time():
+        with _blocked_lock:
+            _blocked_until[host] = max(_blocked_until.get(host, 0.0), reset)
+
+
+# Raised instead of sending while a host's quota is exhausted and resets
+# too far off to wait for; a RequestException, so a stale cache entry is
+# served if there is one
+class RateLimited(requests.RequestException):
+    pass
+
+
+def _wait_for_quota(host: str, url: str) -> None:
+    with _blocked_lock:
+        until = _blocked_until.get(host, 0.0)
+    delay = until - time.time()
+    if delay <= 0:
+        return
+    if delay > MAX_RATE_LIMIT_WAIT:
+        stats.HTTP_ERRORS.inc(host, "RateLimited")
+        raise RateLimited(f"{host} rate limit exhausted for another {int(delay)} s: {url}")
+    # No point sleeping past the deadline
+    _check_deadline(host, url, needed=delay)
+    time.sleep(delay)
+
+
+def _send(method: str, url: str, **kwargs) -> requests.Response:
+    host = urlsplit(url).hostname or ""
+    headers = _auth_headers(host)
+    headers.update(kwargs.pop("headers", None) or {})
+    url = _redirected(url)
+    timeout = kwargs.pop("timeout", None)
+    send = _hedged if _hedge_after is not None and method in ("GET", "HEAD") else _timed_request
+
+    attempt = 0
+    while True:
+        _wait_for_quota(host, url)
+        left = _check_deadline(host, url)
+        try:
+            res = send(host, method, url, headers, timeout=_clamp_timeout(timeout, left), **kwargs)
+        except requests.RequestException as e:
+            # Cut short by the deadline rather than a real failure
+            if _expired():
+                stats.DEADLINES.inc("request")
+                raise DeadlineExceeded(f"Deadline reached during {url}") from e
+            raise
+        _note_rate_limit(host, res)
+        wait = _rate_limit_wait(res, attempt)
+        if wait is None or attempt >= MAX_RATE_LIMIT_RETRIES:
+            return res
+        res.close()
+        _check_deadline(host, url, needed=wait)
+        stats.HTTP_RETRIES.inc(host, "rate_limit")
+        time.sleep(wait)
+        attempt += 1
+
+
+# One session round trip (urllib3 retries included), counted in stats
+def _timed_request(host: str, method: str, url: str, headers: Dict[str, str], **kwargs) -> requests.Response:
+    stats.HTTP_IN_FLIGHT.inc(host)
+    t0 = time.perf_counter()
+    try:
+        res = get_session().request(method, url, headers=headers, **kwargs)
+    except requests.RequestException as e:
+        stats.HTTP_ERRORS.inc(host, type(e).__name__)
+        raise
+    finally:
+        stats.HTTP_IN_FLIGHT.dec(host)
+        stats.HTTP_SECONDS.observe(host, value=time.perf_counter() - t0)
+    stats.HTTP_REQUESTS.inc(host, method, str(res.status_code))
+    history = getattr(getattr(getattr(res, "raw", None), "retries", None), "history", None)
+    if history:
+        stats.HTTP_RETRIES.inc(host, "transient", amount=len(history))
+    return res
+
+
+# Read a streamed body but stop after max_bytes; the connection is closed
+# early so the rest is never transferred
+def _read_capped(res: requests.Response, max_bytes: int, chunk_size: int = 64 * 1024) -> requests.Response:
+    body = bytearray()
+    truncated = cut = False
+    try:
+        for chunk in res.iter_content(chunk_size):
+            if _expired():
+                cut = True
+                break
+            body += chunk
+            if len(body) > max_bytes:
+                truncated = True
+                break
+    except requests.RequestException:
+        if not _expired():
+            raise
+        cut = True
+    finally:
+        res.close()
+    if cut:
+        stats.DEADLINES.inc("request")
+        raise DeadlineExceeded(f"Deadline reached while reading {res.url}")
+    res._content = bytes(body[:max_bytes])
+    res._content_consumed = True
+    res.truncated = truncated
+    return res
+
+
+def _fetch(method: str, url: str, max_bytes: Optional[int], **kwargs) -> requests.Response:
+    if max_bytes is None:
+        return _send(method, url, **kwargs)
+    kwargs["stream"] = True
+    return _read_capped(_send(method, url, **kwargs), max_bytes)
+
+
+def _from_cache(entry: CacheEntry, url: str, max_bytes: Optional[int] = None) -> requests.Response:
+    res = requests.Response()
+    res.status_code = entry.status
+    res.headers = CaseInsensitiveDict(entry.headers)
+    res._content = entry.body if max_bytes is None else entry.body[:max_bytes]
+    res._content_consumed = True
+    res.url = url
+    res.encoding = requests.utils.get_encoding_from_headers(res.headers)
+    res.from_cache = True
+    res.truncated = max_bytes is not None and len(entry.body) > max_bytes
+    return res
+
+
+# max_bytes caps how much of the body is downloaded (res.truncated tells
+# whether it was cut); truncated bodies are never cached
+def request(method: str, url: str, max_bytes: Optional[int] = None, **kwargs) -> requests.Response:
+    with tracing.span(f"{method} {urlsplit(url).hostname}", "http", url=url) as args:
+        res, outcome = _request(method, url, max_bytes, **kwargs)
+        if outcome != "off":
+            stats.CACHE_LOOKUPS.inc(outcome)
+        if args is not None:
+            body = getattr(res, "_content", None)
+            args.update(status=res.status_code, cache=outcome,
+                        bytes=len(body) if isinstance(body, bytes) else None)
+        return res
+
+
+# Response and how the cache took part: "off", "hit", "miss",
+# "revalidated" (304) or "stale" (network error, old entry served)
+def _request(method: str, url: str, max_bytes: Optional[int], **kwargs) -> tuple[requests.Response, str]:
+    cache = get_cache()
+    if cache is None or method not in ("GET", "HEAD") or kwargs.get("stream"):
+        if _offline:
+            raise requests.ConnectionError(f"Offline mode without cache: {url}")
+        return _fetch(method, url, max_bytes, **kwargs), "off"
+
+    full_url = requests.Request(method, url, params=kwargs.pop("params", None)).prepare().url
+    key = f"{method} {full_url}"
+    with tracing.span("cache lookup", "cache") as args:
+        entry = cache.get(key)
+        fresh = entry is not None and (_offline or cache.is_fresh(full_url, entry))
+        if args is not None:
+            args["result"] = "hit" if fresh else "miss"
+    if fresh:
+        return _from_cache(entry, full_url, max_bytes), "hit"
+    if _offline:
+        raise requests.ConnectionError(f"Offline and not cached: {full_url}")
+
+    # Conditional revalidation; GitHub does not count 304s against the quota
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    try:
+        res = _fetch(method, full_url, max_bytes, headers=headers, **kwargs)
+    except (requests.RequestException, DeadlineExceeded):
+        # Network down or out of time: a stale answer beats none
+        if entry is not None:
+            return _from_cache(entry, full_url, max_bytes), "stale"
+        raise
+
+    if res.status_code == 304 and entry is not None:
+        cache.touch(key)
+        return _from_cache(entry, full_url, max_bytes), "revalidated"
+    if res.status_code in (200, 404) and not getattr(res, "truncated", False):
+        with tracing.span("cache store", "cache"):
+            cache.put(key, res.status_code, res.headers, res.content)
+    return res, "miss"
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    return request("HEAD", url, **kwargs)
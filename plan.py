@@ -0,0 +1,84 @@
+# plan.py
+# Planning stage over an input file: fills in code/dataset context
+# carried over from earlier lines and fetches each unique HF model, GitHub
+# repo and dataset once into a shared ResourceStore that every line's
+# Model then reads from, either for a whole list of lines (Plan) or a
+# window ahead of the scorer (prefetch_ahead).
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from model import Model, parse_github_repo, prefetch, submit_prefetch
+from resources import ResourceStore
+
+
+# Lines with an empty code or dataset field inherit the previous line's.
+# Every dataset seen so far is listed under "datasets" so Metrics can
+# record it with Model.add_dataset.
+def carry_forward(inputs: Iterable[Dict[str, str]]) -> Iterator[Dict]:
+    code_url, dataset_url = "", ""
+    datasets: List[str] = []
+    for input_dict in inputs:
+        line = dict(input_dict)
+        if line.get("code_url"):
+            code_url = line["code_url"]
+        else:
+            line["code_url"] = code_url
+        if line.get("dataset_url"):
+            dataset_url = line["dataset_url"]
+        else:
+            line["dataset_url"] = dataset_url
+        if dataset_url and dataset_url not in datasets:
+            datasets.append(dataset_url)
+        line["datasets"] = list(datasets)
+        yield line
+
+
+class Plan:
+    def __init__(self, inputs: Iterable[Dict], store: Optional[ResourceStore] = None) -> None:
+        self.store = store if store is not None else ResourceStore()
+        self.lines = list(inputs)
+        self.models = [
+            Model(line.get("code_url", ""), line.get("dataset_url", ""), line.get("model_url", ""), store=self.store)
+            for line in self.lines
+        ]
+
+        self.hf_models = sorted({m.model_full_repo for m in self.models if m.model_full_repo})
+        self.github_repos = sorted({r for r in (parse_github_repo(m.code_url) for m in self.models) if r})
+        self.datasets = sorted({m.dataset_url for m in self.models if m.dataset_url})
+
+    # Fetch every unique resource once, concurrently (only the given
+    # resource kinds if set, e.g. the freshness signals in incremental mode)
+    def prefetch(self, max_workers: int = 16, kinds: Optional[Iterable[Any]] = None,
+                 pool: Optional[ThreadPoolExecutor] = None, deadline: Optional[float] = None) -> None:
+        prefetch(self.models, max_workers=max_workers, kinds=kinds, pool=pool, deadline=deadline)
+
+
+# Lines with their resources fetched ahead of the scorer: each line's
+# fetches go to pool as it is read, and it is passed on once `ahead` later
+# lines are in (or the input ends), so only that window is in memory.
+# "started" records when the first of its fetches began running; Metrics
+# times the line and its metrics from then, so the wait for them counts
+# toward its latency (time queued behind other lines' fetches does not).
+def prefetch_ahead(inputs: Iterable[Dict], store: ResourceStore, pool: ThreadPoolExecutor, ahead: int,
+                   kinds: Optional[Iterable[Any]] = None, deadline: Optional[float] = None) -> Iterator[Dict]:
+    kinds = list(kinds) if kinds is not None else None
+    seen: set = set()
+    window: deque = deque()
+
+    def release() -> Dict:
+        line, began = window.popleft()
+        if began:
+            line["started"] = min(began)
+        return line
+
+    for input_dict in inputs:
+        line = dict(input_dict)
+        mod = Model(line.get("code_url", ""), line.get("dataset_url", ""), line.get("model_url", ""), store=store)
+        began: list = []
+        submit_prefetch([mod], pool, kinds=kinds, deadline=deadline, seen=seen, began=began)
+        window.append((line, began))
+        if len(window) > ahead:
+            yield release()
+    while window:
+        yield release()
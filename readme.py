@@ -0,0 +1,111 @@
+# readme.py
+# Single-pass README analysis. The cleaned text is lowercased and scanned
+# once for every keyword the README metrics use (one combined alternation,
+# restarted one character after each hit so overlapping keywords such as
+# "install"/"installation" are all seen) and split into words once;
+# ramp-up sections, keyword hits and word counts are then answered from
+# those offsets without rescanning the whole text per keyword.
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+RAMP_UP_SECTIONS: Tuple[str, ...] = (
+    "install",
+    "installation",
+    "usage",
+    "example",
+    "quickstart",
+    "quick start",
+    "download",
+    "how to use"
+)
+RAMP_UP_FILLER = frozenset(("more", "information", "see", "docs"))
+PERF_KWS: Tuple[str, ...] = ("accuracy", "benchmark", "perplexity", "performance")
+DATASET_KWS: Tuple[str, ...] = ("license", "download", "split", "train", "test", "validation")
+
+VOCABULARY: Tuple[str, ...] = tuple(dict.fromkeys(RAMP_UP_SECTIONS + PERF_KWS + DATASET_KWS))
+
+_WORD_CHAR_RE = re.compile(r"\w")
+
+
+def _matcher(keywords: Iterable[str]) -> "re.Pattern[str]":
+    # Longest first so the match at each position is the longest keyword;
+    # every shorter keyword matching there is a prefix of it
+    alternatives = sorted({k.lower() for k in keywords}, key=len, reverse=True)
+    return re.compile("|".join(re.escape(k) for k in alternatives))
+
+
+_DEFAULT_MATCHER = _matcher(VOCABULARY)
+
+
+class ReadmeAnalysis:
+    def __init__(self, text: str, vocabulary: Tuple[str, ...] = VOCABULARY) -> None:
+        self.external = text == "External"
+        self.text = "" if self.external else text.lower()
+        self.word_count = len(self.text.split())
+
+        # keyword -> sorted start offsets of every (overlapping) occurrence
+        self._hits: Dict[str, List[int]] = {}
+        self._scanned: set = set()
+        matcher = _DEFAULT_MATCHER if vocabulary is VOCABULARY else _matcher(vocabulary)
+        self._scan(vocabulary, matcher)
+
+    def _scan(self, keywords: Iterable[str], matcher: "re.Pattern[str]") -> None:
+        keywords = [k.lower() for k in keywords]
+        by_prefix: Dict[str, List[str]] = {}
+        search = matcher.search
+        m = search(self.text)
+        while m is not None:
+            found = m.group()
+            matches = by_prefix.get(found)
+            if matches is None:
+                matches = by_prefix[found] = [k for k in keywords if found.startswith(k)]
+            for k in matches:
+                self._hits.setdefault(k, []).append(m.start())
+            m = search(self.text, m.start() + 1)
+        self._scanned.update(keywords)
+
+    def occurrences(self, keyword: str) -> List[int]:
+        keyword = keyword.lower()
+        if keyword not in self._scanned:
+            self._scan([keyword], _matcher([keyword]))
+        return self._hits.get(keyword, [])
+
+    def first(self, keyword: str) -> Optional[int]:
+        hits = self.occurrences(keyword)
+        return hits[0] if hits else None
+
+    # Substring match, like `kw in text`
+    def contains_any(self, keywords: Iterable[str]) -> bool:
+        return any(self.occurrences(k) for k in keywords)
+
+    # Whole-word match, like re.search(r"\b" + kw + r"\b", text)
+    def has_word(self, keywords: Iterable[str]) -> bool:
+        text = self.text
+        for k in keywords:
+            k = k.lower()
+            for start in self.occurrences(k):
+                end = start + len(k)
+                before = start > 0 and _WORD_CHAR_RE.match(text, start - 1) is not None
+                after = end < len(text) and _WORD_CHAR_RE.match(text, end) is not None
+                if (before != bool(_WORD_CHAR_RE.match(k[0]))) and (after != bool(_WORD_CHAR_RE.match(k[-1]))):
+                    return True
+        return False
+
+    # Words (ignoring filler) between the first occurrence of `section` and
+    # the next occurrence of any of `sections` after it
+    def section_words(self, section: str, sections: Iterable[str]) -> int:
+        first = self.first(section)
+        if first is None:
+            return 0
+        a = first + len(section)
+        b = len(self.text)
+        for other in sections:
+            hits = self.occurrences(other)
+            i = bisect_left(hits, a)
+            if i < len(hits) and hits[i] < b:
+                b = hits[i]
+        return self._words_between(a, b)
+
+    def _words_between(self, a: int, b: int) -> int:
+        return sum(1 for w in self.text[a:b].split() if w not in RAMP_UP_FILLER)
@@ -0,0 +1,167 @@
+# registry.py
+# Metric registry and resource DAG. Each metric declares the resources it
+# reads (HF model info, repo info, READMEs, ...) and its output field;
+# run_dag fetches just the resources the selected metrics need, each once
+# and as soon as its own dependencies are in, and starts every metric the
+# moment its inputs have arrived.
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+
+class Resource:
+    def __init__(self, load: Callable[[Any], Any], deps: Tuple[str, ...] = (),
+                 prefetch_kind: Optional[Hashable] = None) -> None:
+        self.load = load
+        self.deps = deps
+        # Store key kind warmed by model.prefetch for this resource, if any
+        # (see model.prefetch_kind)
+        self.prefetch_kind = prefetch_kind
+
+
+# Loaders take a Model; all of them are memoized in its ResourceStore
+RESOURCES: Dict[str, Resource] = {
+    "model_info": Resource(lambda mod: mod.metadata, prefetch_kind="metadata"),
+    "dataset_info": Resource(lambda mod: mod.dataset_metadata, prefetch_kind="dataset_metadata"),
+    "repo_info": Resource(lambda mod: mod.get_repo_info(), prefetch_kind="repo_info"),
+    "contributors": Resource(lambda mod: mod.get_contrib(), prefetch_kind="contributors"),
+    "code_readme": Resource(lambda mod: mod.readme_analysis("code"), prefetch_kind=("readme", "code")),
+    # Only the card fallback reads dataset_info, which it loads through the
+    # store itself; no dependency, so both fetches run in parallel
+    "dataset_readme": Resource(lambda mod: mod.readme_analysis("dataset"), prefetch_kind=("readme", "dataset")),
+    "file_sizes": Resource(lambda mod: mod.get_size(), ("model_info",)),
+}
+
+
+class MetricSpec:
+    # compute: name of a Metrics method, or a callable taking the Metrics
+    # instance; either returns {field: score, field + "_latency": ms}
+    def __init__(self, field: str, compute: Union[str, Callable[[Any], Dict[str, Any]]],
+                 resources: Tuple[str, ...] = ()) -> None:
+        unknown = [r for r in resources if r not in RESOURCES]
+        if unknown:
+            raise ValueError(f"Unknown resources for {field}: {', '.join(unknown)}")
+        self.field = field
+        self.compute = compute
+        self.resources = resources
+
+    def task(self, metrics: Any) -> Callable[[], Dict[str, Any]]:
+        if isinstance(self.compute, str):
+            return getattr(metrics, self.compute)
+        task = lambda: self.compute(metrics)
+        task.__name__ = self.field
+        return task
+
+
+# Output field -> spec, in output order
+METRICS: "OrderedDict[str, MetricSpec]" = OrderedDict()
+
+
+def register(spec: MetricSpec) -> MetricSpec:
+    METRICS[spec.field] = spec
+    return spec
+
+
+for _spec in (
+    MetricSpec("ramp_up_time", "compute_ramp_up", ("code_readme",)),
+    MetricSpec("bus_factor", "compute_bus_factor", ("contributors",)),
+    MetricSpec("performance_claims", "compute_perf_claims", ("code_readme",)),
+    # The GitHub repo_info is only a fallback for a card without a license,
+    # so compute_license loads it lazily instead of every line fetching it
+    MetricSpec("license", "compute_license", ("model_info",)),
+    MetricSpec("size_score", "compute_size", ("file_sizes",)),
+    MetricSpec("dataset_and_code_score", "compute_ds_code"),
+    MetricSpec("dataset_quality", "compute_ds_quality", ("dataset_info", "dataset_readme")),
+    MetricSpec("code_quality", "compute_code_quality", ("repo_info", "code_readme")),
+):
+    register(_spec)
+
+# The metrics net_score is weighted over
+NET_SCORE_FIELDS: Tuple[str, ...] = tuple(METRICS)
+
+
+# Specs for the given fields in registry order (all when None)
+def select(fields: Optional[Iterable[str]] = None) -> List[MetricSpec]:
+    if fields is None:
+        return list(METRICS.values())
+    wanted = set(fields)
+    unknown = wanted - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))} (known: {', '.join(METRICS)})")
+    return [spec for field, spec in METRICS.items() if field in wanted]
+
+
+# Every resource the specs need, dependencies included
+def needed_resources(specs: Iterable[MetricSpec]) -> List[str]:
+    needed: List[str] = []
+
+    def visit(name: str) -> None:
+        if name in needed:
+            return
+        for dep in RESOURCES[name].deps:
+            visit(dep)
+        needed.append(name)
+
+    for spec in specs:
+        for name in spec.resources:
+            visit(name)
+    return needed
+
+
+# model.prefetch kinds covering the resources of the specs
+def prefetch_kinds(specs: Iterable[MetricSpec]) -> List[Hashable]:
+    kinds = [RESOURCES[name].prefetch_kind for name in needed_resources(specs)]
+    return list(dict.fromkeys(k for k in kinds if k))
+
+
+# Future of fn(), started once all deps futures are done (failed or not).
+# fn runs in the caller's context (e.g. its net.deadline).
+def _after(pool: ThreadPoolExecutor, deps: List[Future], fn: Callable[[], Any]) -> Future:
+    out: Future = Future()
+    remaining = [len(deps)]
+    lock = threading.Lock()
+    context = contextvars.copy_context()
+
+    def finish(inner: Future) -> None:
+        if inner.exception() is not None:
+            out.set_exception(inner.exception())
+        else:
+            out.set_result(inner.result())
+
+    def start() -> None:
+        pool.submit(context.run, fn).add_done_callback(finish)
+
+    # Dependencies may complete on different threads
+    def dep_done(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            ready = remaining[0] == 0
+        if ready:
+            start()
+
+    if not deps:
+        start()
+    for dep in deps:
+        dep.add_done_callback(dep_done)
+    return out
+
+
+# Fetch the resources of specs on a pool and run each metric (through
+# call(task)) once its resources are in; results in spec order. With
+# fetch=False metrics start right away and load what they read lazily.
+def run_dag(mod: Any, metrics: Any, specs: List[MetricSpec], call: Callable[[Callable], Dict[str, Any]],
+            max_workers: int = 8, fetch: bool = True) -> List[Dict[str, Any]]:
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures: Dict[str, Future] = {}
+        for name in (needed_resources(specs) if fetch else []):
+            resource = RESOURCES[name]
+            futures[name] = _after(pool, [futures[d] for d in resource.deps],
+                                   lambda resource=resource: resource.load(mod))
+        pending = [
+            _after(pool, [futures[r] for r in spec.resources if r in futures],
+                   lambda task=spec.task(metrics): call(task))
+            for spec in specs
+        ]
+        return [f.result() for f in pending]
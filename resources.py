@@ -0,0 +1,71 @@
+# resources.py
+# Shared store for fetched resources (HF model info, GitHub repo data,
+# READMEs, ...). Each key is loaded once; callers asking for a key that is
+# already being loaded wait for that load instead of starting their own
+# (in-flight request coalescing), so many Models can share one store.
+# Waiters keep their own net.deadline: they stop waiting when it runs out,
+# and take over a load whose owner ran out of its budget.
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Hashable
+
+import net
+import stats
+import tracing
+
+
+class ResourceStore:
+    def __init__(self) -> None:
+        self._values: Dict[Hashable, Any] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+                future = self._inflight.get(key)
+                owner = future is None
+                if owner:
+                    future = self._inflight[key] = Future()
+            if owner:
+                break
+
+            # The load is traced under whichever caller got there first; the
+            # others show up as waits for it
+            with tracing.span("wait", "resource", key=key):
+                try:
+                    return future.result(timeout=net.time_left())
+                except net.DeadlineExceeded:
+                    # The owner's budget ran out, not necessarily ours: retry
+                    continue
+                except FutureTimeout:
+                    stats.DEADLINES.inc("request")
+                    raise net.DeadlineExceeded(f"Deadline reached waiting for {key}")
+
+        try:
+            with tracing.span("load", "resource", key=key):
+                value = loader()
+        except BaseException as e:
+            # Not cached: the next caller retries
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._values[key] = value
+            del self._inflight[key]
+        future.set_result(value)
+        return value
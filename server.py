@@ -0,0 +1,175 @@
+# server.py
+# Long-running scoring daemon (./run serve). One process keeps the pooled
+# HTTP session, the response cache, the state store, a worker pool and a
+# ResourceStore of recent fetches warm across jobs, so a small job costs
+# its own requests instead of interpreter start-up, imports and TLS
+# handshakes. Jobs are NDJSON objects, one per line, read from stdin or
+# from clients of a Unix socket (--socket PATH):
+#
+#   {"id": "a", "lines": ["code_url,dataset_url,model_url", ...], "metrics": ["license"], "deadline": 5}
+#   {"id": "b", "path": "urls.txt"}
+#   {"id": "c", "code_url": "", "dataset_url": "", "model_url": "https://huggingface.co/org/model"}
+#
+# Results stream back as the same records ./run prints, then one
+# {"job": id, "done": true, "count": n, "seconds": s} line per job, or
+# {"job": id, "error": "..."} if the job could not be run.
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import argparse
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import model
+import registry
+from main import parse_input, parse_lines, score_inputs
+from resources import ResourceStore
+from state import StateStore
+
+log = logging.getLogger(__name__)
+
+DEFAULT_STORE_TTL = 300.0  # seconds a fetched resource is reused across jobs
+
+
+class Daemon:
+    def __init__(self, args: argparse.Namespace, store_ttl: float = DEFAULT_STORE_TTL) -> None:
+        self.args = args
+        self.store_ttl = store_ttl
+        self.pool = ThreadPoolExecutor(max_workers=max(args.jobs, 8), thread_name_prefix="score")
+        self.state = StateStore(args.state, max_age=args.state_max_age * 86400) if args.state else None
+        self._store: Optional[ResourceStore] = None
+        self._store_since = 0.0
+        self._lock = threading.Lock()
+
+    # Store shared by jobs; replaced (with the process-level caches of
+    # model) once it is older than store_ttl so repo changes show up
+    def store(self) -> ResourceStore:
+        with self._lock:
+            now = time.monotonic()
+            if self._store is None or now - self._store_since > self.store_ttl:
+                if self._store is not None:
+                    model.clear_preloaded()
+                self._store = ResourceStore()
+                self._store_since = now
+            return self._store
+
+    # Job -> input dicts (see the module comment for the accepted forms)
+    @staticmethod
+    def job_inputs(job: Dict[str, Any]) -> List[Dict[str, str]]:
+        if "lines" in job:
+            return list(parse_lines(job["lines"]))
+        if "path" in job:
+            return list(parse_input(job["path"]))
+        if "model_url" in job:
+            return [{key: job.get(key, "") for key in ("code_url", "dataset_url", "model_url")}]
+        raise ValueError('job needs "lines", "path" or "model_url"')
+
+    # Daemon options with the job's own metric selection and deadlines, if any
+    def job_args(self, job: Dict[str, Any]) -> argparse.Namespace:
+        args = argparse.Namespace(**vars(self.args))
+        if job.get("metrics") is not None:
+            registry.select(job["metrics"])
+            args.metrics = list(job["metrics"])
+        for key in ("deadline", "metric_deadline"):
+            if job.get(key) is not None:
+                setattr(args, key, float(job[key]))
+        return args
+
+    def run_job(self, job: Dict[str, Any], emit: Callable[[Dict[str, Any]], None]) -> None:
+        job_id = job.get("id")
+        t0 = time.perf_counter()
+        try:
+            inputs = self.job_inputs(job)
+            args = self.job_args(job)
+        except Exception as e:
+            emit({"job": job_id, "error": f"{type(e).__name__}: {e}"})
+            return
+        count = 0
+        for result in score_inputs(inputs, args, store=self.store(), state=self.state, pool=self.pool):
+            emit(result)
+            count += 1
+        emit({"job": job_id, "done": True, "count": count,
+              "seconds": round(time.perf_counter() - t0, 3)})
+
+    # One job per NDJSON line of lines; results through emit
+    def serve_lines(self, lines: Iterable[str], emit: Callable[[Dict[str, Any]], None]) -> None:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError("job must be a JSON object")
+            except ValueError as e:
+                emit({"job": None, "error": f"Invalid job: {e}"})
+                continue
+            try:
+                self.run_job(job, emit)
+            except Exception as e:
+                log.error("Job %s failed: %s", job.get("id"), e, extra={"job": job.get("id")})
+                emit({"job": job.get("id"), "error": f"{type(e).__name__}: {e}"})
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.state is not None:
+            self.state.close()
+
+
+def _writer(stream) -> Callable[[Dict[str, Any]], None]:
+    def emit(obj: Dict[str, Any]) -> None:
+        stream.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        stream.flush()
+    return emit
+
+
+def serve_stdin(daemon: Daemon) -> None:
+    daemon.serve_lines(sys.stdin, _writer(sys.stdout))
+
+
+# Each connection is a job stream of its own; connections run concurrently
+# on the shared pool, store and session
+def serve_socket(daemon: Daemon, path: str) -> socketserver.ThreadingUnixStreamServer:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            def emit(obj: Dict[str, Any]) -> None:
+                self.wfile.write((json.dumps(obj, ensure_ascii=False) + "\n").encode())
+                self.wfile.flush()
+            try:
+                daemon.serve_lines((line.decode("utf-8") for line in self.rfile), emit)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    return server
+
+
+def _stop(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+
+def main(args: argparse.Namespace) -> None:
+    daemon = Daemon(args, store_ttl=args.store_ttl)
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        if args.socket:
+            server = serve_socket(daemon, args.socket)
+            log.info("Serving jobs on %s", args.socket, extra={"socket": args.socket})
+            try:
+                server.serve_forever()
+            finally:
+                server.server_close()
+                os.unlink(args.socket)
+        else:
+            serve_stdin(daemon)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
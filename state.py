@@ -0,0 +1,167 @@
+# state.py
+# Incremental re-scoring: metric results from earlier runs, stored in
+# SQLite with a fingerprint of the inputs they were computed from. The
+# fingerprint uses cheap freshness signals (HF sha/lastModified, GitHub
+# pushed_at, the dataset's sha or pushed_at and the few counters metrics
+# read directly), all from the metadata payloads fetched anyway. A metric
+# whose fingerprint is unchanged reuses its stored result and skips its
+# README, contributor and size requests; only metrics whose inputs
+# changed are recomputed.
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import stats
+
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60  # recompute anything older, whatever the signals say
+
+
+def _model_rev(mod) -> Optional[str]:
+    if not mod.model_full_repo:
+        return "-"
+    info = mod.metadata
+    if info is None:
+        return None
+    return f"{info.sha}|{info.last_modified}"
+
+
+def _code_rev(mod) -> Optional[str]:
+    if mod.github_repo() is None:
+        return "-"
+    return mod.get_repo_info().get("pushed_at")
+
+
+def _code_popularity(mod) -> Optional[str]:
+    if mod.github_repo() is None:
+        return "-"
+    info = mod.get_repo_info()
+    if not info:
+        return None
+    return f"{info.get('stargazers_count', 0)}|{info.get('forks_count', 0)}"
+
+
+# Maintenance flag of code quality; flips with the calendar, not the repo
+def _code_recent(mod) -> Optional[str]:
+    return str(mod.last_modified("github", 180))
+
+
+# Hub sha/lastModified, or pushed_at for a dataset hosted on GitHub. Other
+# hosts score as "External" whatever their content, so "-" covers them.
+def _dataset_rev(mod) -> Optional[str]:
+    if mod.dataset_full_repo:
+        info = mod.dataset_metadata
+        if info is None:
+            return None
+        return f"{info.sha}|{info.last_modified}"
+    if mod.dataset_github_repo() is not None:
+        return mod.get_dataset_repo_info().get("pushed_at")
+    return "-"
+
+
+def _dataset_downloads(mod) -> Optional[str]:
+    return str(mod.get_downloads("dataset"))
+
+
+SIGNALS: Dict[str, Callable[[Any], Optional[str]]] = {
+    "model_rev": _model_rev,
+    "code_rev": _code_rev,
+    "code_popularity": _code_popularity,
+    "code_recent": _code_recent,
+    "dataset_rev": _dataset_rev,
+    "dataset_downloads": _dataset_downloads,
+}
+
+# Metric -> signals covering everything it reads besides the line's URLs.
+# Contributors and the code README only change with a push (code_rev);
+# model files and card data with a new HF revision (model_rev).
+METRIC_INPUTS: Dict[str, Tuple[str, ...]] = {
+    "compute_license": ("model_rev", "code_rev"),
+    "compute_size": ("model_rev",),
+    "compute_ramp_up": ("code_rev",),
+    "compute_bus_factor": ("code_rev",),
+    "compute_perf_claims": ("code_rev",),
+    "compute_ds_code": (),
+    "compute_ds_quality": ("dataset_rev", "dataset_downloads"),
+    "compute_code_quality": ("code_rev", "code_popularity", "code_recent"),
+}
+
+
+class StateStore:
+    def __init__(self, path: str, max_age: float = DEFAULT_MAX_AGE) -> None:
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " line TEXT, metric TEXT, fingerprint TEXT, result TEXT, computed_at REAL,"
+            " PRIMARY KEY (line, metric))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def line_key(mod) -> str:
+        return json.dumps([mod.model_url, mod.code_url, mod.dataset_url])
+
+    # Hash of the metric's input signals, or None if one is unavailable
+    # (fetch failed): such results are neither reused nor stored
+    def fingerprint(self, mod, metric: str) -> Optional[str]:
+        inputs = METRIC_INPUTS.get(metric)
+        if inputs is None:
+            return None
+        values = []
+        for name in inputs:
+            value = SIGNALS[name](mod)
+            if value is None:
+                return None
+            values.append(f"{name}={value}")
+        return hashlib.sha1("\n".join(values).encode()).hexdigest()
+
+    def get(self, line: str, metric: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, result, computed_at FROM results WHERE line = ? AND metric = ?",
+                (line, metric),
+            ).fetchone()
+        if row is None or row[0] != fingerprint or time.time() - row[2] > self.max_age:
+            return None
+        return json.loads(row[1])
+
+    def put(self, line: str, metric: str, fingerprint: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (line, metric, fingerprint, result, computed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (line, metric, fingerprint, json.dumps(result), time.time()),
+            )
+            self._conn.commit()
+
+    # Stored result of task when its inputs are unchanged, else task() (and
+    # store it). *_latency fields of a reused result are this lookup's time.
+    def run(self, mod, task: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        metric = task.__name__
+        fingerprint = self.fingerprint(mod, metric)
+        if fingerprint is None:
+            stats.STATE_RESULTS.inc("unknown")
+            return task()
+
+        line = self.line_key(mod)
+        stored = self.get(line, metric, fingerprint)
+        if stored is not None:
+            stats.STATE_RESULTS.inc("reused")
+            latency = int(round((time.perf_counter() - t0) * 1000.0))
+            return {k: latency if k.endswith("_latency") else v for k, v in stored.items()}
+
+        stats.STATE_RESULTS.inc("computed")
+        result = task()
+        self.put(line, metric, fingerprint, result)
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,203 @@
+# stats.py
+# Process-wide counters, gauges and histograms for long scoring runs
+# (requests per host and status, retries, cache outcomes, in-flight
+# requests, metric latencies, log messages by level), rendered in the
+# Prometheus text format. Dump them at exit (write) or serve them on a
+# local port (serve) for scraping.
+import logging
+import threading
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; spans cache hits (sub-ms) up to slow downloads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in items]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts incl. +Inf, sum, count)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *labels: str, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(labels) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[index] += 1
+            self._values[labels] = (counts, total + value, count + 1)
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+REGISTRY: List = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+HTTP_REQUESTS = _register(Counter("score_http_requests_total", "HTTP responses received",
+                                  ("host", "method", "status")))
+HTTP_ERRORS = _register(Counter("score_http_errors_total", "HTTP requests that raised (timeouts, resets)",
+                                ("host", "error")))
+HTTP_RETRIES = _register(Counter("score_http_retries_total", "HTTP retries",
+                                 ("host", "reason")))
+HTTP_HEDGES = _register(Counter("score_http_hedges_total", "Hedged requests sent, and won by the hedge",
+                                 ("host", "outcome")))
+DEADLINES = _register(Counter("score_deadlines_total", "Requests and metrics cut short by a deadline",
+                              ("scope",)))
+HTTP_IN_FLIGHT = _register(Gauge("score_http_in_flight", "HTTP requests currently in flight", ("host",)))
+HTTP_SECONDS = _register(Histogram("score_http_request_seconds", "HTTP request duration", ("host",)))
+CACHE_LOOKUPS = _register(Counter("score_cache_lookups_total",
+                                  "Response cache outcomes (hit, miss, revalidated, stale)", ("result",)))
+METRIC_SECONDS = _register(Histogram("score_metric_seconds", "Metric computation duration", ("metric",)))
+LINES = _register(Counter("score_lines_total", "Input lines scored", ("outcome",)))
+STATE_RESULTS = _register(Counter("score_state_results_total",
+                                  "Incremental mode: metric results reused, computed, or unknown inputs",
+                                  ("result",)))
+LOG_MESSAGES = _register(Counter("score_log_messages_total", "Log records emitted", ("logger", "level")))
+
+
+def render() -> str:
+    out = []
+    for metric in REGISTRY:
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(metric.samples())
+    return "\n".join(out) + "\n"
+
+
+def write(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render())
+
+
+def reset() -> None:
+    for metric in REGISTRY:
+        metric.reset()
+
+
+# Serve render() at http://host:port/metrics from a daemon thread
+def serve(port: int, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+    # Imported here: http.server is slow to import and rarely needed
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Counts every log record by logger and level (error rates per component)
+class LogCounter(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        LOG_MESSAGES.inc(record.name, record.levelname)
+
+
+_log_counter: Optional[LogCounter] = None
+
+
+def count_logs() -> None:
+    global _log_counter
+    if _log_counter is None:
+        _log_counter = LogCounter()
+        logging.getLogger().addHandler(_log_counter)
@@ -1,7 +1,33 @@
 # tests/test.py
+import os
+import sys
 import pytest
 from unittest.mock import patch, MagicMock
 from metrics import Metrics
+from readme import ReadmeAnalysis
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+from stub_server import StubServer
+
+
+# One local GitHub/HF stub (bench/stub_server.py) for the whole module
+@pytest.fixture(scope="module")
+def stub_server():
+    with StubServer() as server:
+        yield server
+
+
+# The stub with every host redirected to it and no response cache. Each
+# test starts from the default config with zero counts and sets on
+# stub.config only what it needs (latency, README size, replayed routes).
+@pytest.fixture
+def stub(stub_server):
+    import net
+    stub_server.reset()
+    net.configure_cache(None)
+    net.redirect_hosts(stub_server.redirects())
+    yield stub_server
+    net.redirect_hosts(None)
 
 # --- Helper function to create a mocked Metrics instance ---
 def create_mock_metrics(mock_values):
@@ -14,6 +40,7 @@ def create_mock_metrics(mock_values):
             "category": mock_values.get("category", "MODEL")
         }
         instance.fetch_readme.return_value = mock_values.get("readme", "")
+        instance.readme_analysis.side_effect = lambda which: ReadmeAnalysis(mock_values.get("readme", ""))
         instance.get_contrib.return_value = mock_values.get("contrib", 10)
         instance.get_license.return_value = mock_values.get("license", "mit")
         instance.get_size.return_value = mock_values.get("size", 1.0)
@@ -87,3 +114,773 @@ def test_net_score():
     metrics = create_mock_metrics({})
     results = metrics.run()
     assert 0 <= results["net_score"] <= 1.0
+
+def test_readme_fetched_once_per_url():
+    from model import Model
+    with patch("model.net.get") as mock_get:
+        mock_get.return_value = MagicMock(text="# Install\n**pip** install it")
+        mod = Model("https://github.com/org/repo", "", "https://huggingface.co/org/model")
+        assert mod.fetch_readme("code") == "Install\npip install it"
+        mod.len_readme("code")
+        mod.kw_check(["install"], "code")
+        assert mod.get_readme("code")["raw"] == "# Install\n**pip** install it"
+        readme_calls = [c for c in mock_get.call_args_list if "api/models" not in c.args[0]]
+        assert len(readme_calls) == 1
+
+def test_concurrent_run_matches_serial():
+    values = {"readme": "installation usage example benchmark", "contrib": 7, "size": 2.0}
+    serial = create_mock_metrics(values).run()
+    metrics = create_mock_metrics(values)
+    metrics.concurrent = True
+    parallel = metrics.run()
+    assert list(parallel.keys()) == list(serial.keys())
+    for key, value in serial.items():
+        if not key.endswith("_latency"):
+            assert parallel[key] == value
+
+def test_score_lines_ordered_with_error_record():
+    import main
+
+    def fake_score(input_dict):
+        if input_dict["model_url"] == "bad":
+            raise RuntimeError("boom")
+        return {"name": input_dict["model_url"]}
+
+    inputs = [{"code_url": "", "dataset_url": "", "model_url": m} for m in ["a", "bad", "c", "d"]]
+    with patch("metrics.Metrics") as MockMetrics:
+        MockMetrics.side_effect = lambda d, **kwargs: MagicMock(run=lambda: fake_score(d))
+        results = list(main.score_lines(inputs, jobs=3))
+        unordered = list(main.score_lines(inputs, jobs=3, ordered=False))
+
+    assert [r["name"] for r in results] == ["a", "bad", "c", "d"]
+    assert "boom" in results[1]["error"]
+    assert sorted(r["name"] for r in unordered) == ["a", "bad", "c", "d"]
+
+def test_net_backs_off_on_rate_limit():
+    import net
+
+    limited = MagicMock(status_code=429, headers={"Retry-After": "0"})
+    ok = MagicMock(status_code=200, headers={})
+    session = MagicMock()
+    session.request.side_effect = [limited, ok]
+    with patch("net.get_session", return_value=session), patch("net.time.sleep") as mock_sleep, \
+            patch.dict("os.environ", {"GITHUB_TOKEN": "abc"}):
+        res = net.get("https://api.github.com/repos/org/repo", timeout=10)
+
+    assert res is ok
+    assert session.request.call_count == 2
+    assert mock_sleep.called
+    assert session.request.call_args.kwargs["headers"]["Authorization"] == "Bearer abc"
+
+def test_response_cache_revalidates_with_etag(tmp_path):
+    import net
+
+    import requests
+    first = requests.Response()
+    first.status_code = 200
+    first.headers["ETag"] = '"v1"'
+    first._content = b'{"stargazers_count": 5}'
+    not_modified = MagicMock(status_code=304, headers={})
+    net.configure_cache(str(tmp_path / "cache.sqlite"))
+    try:
+        with patch("net._send", side_effect=[first, not_modified]) as mock_send:
+            url = "https://api.github.com/repos/org/repo"
+            assert net.get(url, timeout=10).json()["stargazers_count"] == 5
+            # Force the entry stale so the next call revalidates
+            net.get_cache().default_ttl = 0
+            net.get_cache()._ttls = []
+            res = net.get(url, timeout=10)
+            assert res.from_cache and res.json()["stargazers_count"] == 5
+            assert mock_send.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+        net.configure_cache(str(tmp_path / "cache.sqlite"), offline=True)
+        with patch("net._send") as mock_send:
+            assert net.get(url, timeout=10).json()["stargazers_count"] == 5
+            assert not mock_send.called
+    finally:
+        net.configure_cache(None)
+
+def test_response_cache_batches_access_times_and_keeps_lru_order(tmp_path):
+    from cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=3000)
+    cache.put("a", 200, {}, b"x" * 1000)
+    cache.put("b", 200, {}, b"x" * 1000)
+    changes = cache._conn.total_changes
+    for _ in range(50):
+        assert cache.get("a").body == b"x" * 1000
+    # Hits write nothing until a batch is flushed
+    assert cache._conn.total_changes == changes
+
+    # ... but the pending hit still makes "b" the least recently used entry
+    cache.put("c", 200, {}, b"x" * 1000)
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache._total == cache._sum_sizes() <= 3000
+    cache.close()
+
+def test_repo_info_shared_by_license_stats_and_last_modified():
+    from model import Model
+    from datetime import datetime, timezone
+    repo_payload = {
+        "license": {"name": "MIT License"},
+        "stargazers_count": 12,
+        "forks_count": 3,
+        "pushed_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+    }
+    with patch("model.net.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200, json=lambda: repo_payload)
+        mod = Model("https://github.com/org/repo/tree/main", "", "")
+        mod.metadata = None
+        assert mod.get_license() == "MIT License"
+        assert mod.get_git_stats() == {"stars": 12, "forks": 3}
+        assert mod.last_modified("github", 180) is True
+        api_calls = [c.args[0] for c in mock_get.call_args_list if "api.github.com" in c.args[0]]
+        assert api_calls == ["https://api.github.com/repos/org/repo"]
+
+def test_size_from_file_metadata_without_double_counting():
+    from model import Model
+    from huggingface_hub import ModelInfo
+    with patch("model.net.get"), patch("model.net.head") as mock_head:
+        mod = Model("", "", "https://huggingface.co/org/model")
+        mod.metadata = ModelInfo(id="org/model", siblings=[
+            {"rfilename": "model-00001-of-00002.safetensors", "size": 2 * 1024**3},
+            {"rfilename": "model-00002-of-00002.safetensors", "size": 1024**3},
+            {"rfilename": "pytorch_model.bin", "size": 3 * 1024**3},
+            {"rfilename": "onnx/model.bin"},
+            {"rfilename": "config.json", "size": 10},
+        ])
+        mock_head.return_value = MagicMock(headers={"Content-Length": str(1024**3)})
+        assert mod.get_size() == 4.0
+        mock_head.assert_called_once()
+
+def test_model_loads_metadata_lazily_and_prefetches():
+    import model
+    with patch("model.net.get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=200, json=lambda: {"id": "org/m", "downloads": 7})
+        mods = [model.Model("", "", f"https://huggingface.co/org/m{i}") for i in range(3)]
+        assert mock_get.call_count == 0
+        model.prefetch(mods)
+        assert mock_get.call_count == 3
+        assert [m.get_downloads() for m in mods] == [7, 7, 7]
+        assert mock_get.call_count == 3
+
+def test_ramp_up_counts_words_between_sections():
+    readme = "Installation\n" + "run the setup script " * 15 + "\nUsage\n" + "see docs more information"
+    results = create_mock_metrics({"readme": readme}).run()
+    # install/installation sections are full, usage has only filler words
+    assert results["ramp_up_time"] == 0.25
+
+def test_clean_readme_strips_html_and_markdown():
+    from strip import clean_readme
+    text = ("# Title\n\n<!-- a comment\n\nspanning paragraphs -->\n<p align=\"center\">Logo &amp; name</p>\n\n"
+            "## Install\n\nRun `pip install\n\npkg` then see [the docs](https://x.y/z).\n\n"
+            "Some **bold** and _italic_ text < 3.\n") * 20
+    whole = clean_readme(text)
+    assert "Logo & name" in whole and "<p" not in whole and "comment" not in whole
+
+def test_readme_download_is_capped_and_not_cached(tmp_path):
+    import io
+    import net
+    import requests
+    from model import Model
+
+    def streamed(*args, **kwargs):
+        res = requests.Response()
+        res.status_code = 200
+        res.headers["Content-Type"] = "text/plain; charset=utf-8"
+        res.raw = io.BytesIO(b"word " * 100000)
+        return res
+
+    net.configure_cache(str(tmp_path / "cache.sqlite"))
+    try:
+        with patch("net._send", side_effect=streamed) as mock_send, patch.object(Model, "readme_max_bytes", 1000):
+            mod = Model("https://github.com/org/repo/tree/main", "", "")
+            entry = mod.get_readme("code")
+            assert entry["truncated"] and len(entry["raw"]) == 1000
+            assert mod.len_readme("code") == 200
+            assert mock_send.call_args.kwargs["stream"] is True
+            assert net.get_cache().get("GET https://github.com/org/repo/raw/main/README.md") is None
+    finally:
+        net.configure_cache(None)
+
+def test_github_batch_preloads_repos_from_stub_server():
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import github_batch
+    import model
+
+    received = []
+
+    class GraphQLStub(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            received.append(body)
+            data = {}
+            for key, value in body["variables"].items():
+                if key.endswith("_name"):
+                    alias = key[:-len("_name")]
+                    data[alias] = {
+                        "licenseInfo": {"name": "MIT License", "spdxId": "MIT"},
+                        "stargazerCount": 20000, "forkCount": 6000,
+                        "pushedAt": "2020-01-01T00:00:00Z",
+                        "defaultBranchRef": {"target": {"committedDate": "2020-01-01T00:00:00Z"}},
+                        "readme": {"text": f"# {value}\nUsage example", "isBinary": False},
+                    }
+            payload = json.dumps({"data": data}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GraphQLStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    inputs = [{"code_url": f"https://github.com/org/repo{i}"} for i in range(5)]
+    inputs.append({"code_url": "https://github.com/org/repo0/tree/main"})
+    try:
+        with patch.object(github_batch, "GRAPHQL_URL", f"http://127.0.0.1:{server.server_port}/graphql"), \
+                patch.dict("os.environ", {"GITHUB_TOKEN": "t"}):
+            assert github_batch.preload_inputs(inputs, batch_size=4) == 5
+        assert len(received) == 2
+
+        with patch("model.net.get", side_effect=AssertionError("network used")):
+            mod = model.Model("https://github.com/org/repo3", "", "")
+            mod.metadata = None
+            assert mod.get_license() == "MIT License"
+            assert mod.get_git_stats() == {"stars": 20000, "forks": 6000}
+            assert mod.fetch_readme("code") == "repo3\nUsage example"
+    finally:
+        server.shutdown()
+        model._preloaded_repo_info.clear()
+        model._preloaded_readmes.clear()
+
+def test_contributor_count_from_link_header():
+    import model
+    link = '<https://api.github.com/repositories/1/contributors?per_page=1&page=2>; rel="next", ' \
+           '<https://api.github.com/repositories/1/contributors?per_page=1&page=342>; rel="last"'
+    res = MagicMock(status_code=200, links={
+        "last": {"url": "https://api.github.com/repositories/1/contributors?per_page=1&page=342"}},
+        headers={"Link": link})
+    try:
+        with patch("model.net.get", return_value=res) as mock_get:
+            assert model.Model("https://github.com/org/big", "", "").get_contrib() == 342
+            assert model.Model("https://github.com/org/big/tree/main", "", "").get_contrib() == 342
+            assert mock_get.call_count == 1
+            assert mock_get.call_args.kwargs["params"] == {"per_page": 1}
+    finally:
+        model._contributor_counts.clear()
+
+def test_plan_carries_context_forward_and_fetches_shared_resources_once():
+    import threading
+    import time
+    from plan import Plan, carry_forward
+
+    lines = [
+        {"code_url": "https://github.com/org/repo", "dataset_url": "https://huggingface.co/datasets/org/ds",
+         "model_url": "https://huggingface.co/org/m1"},
+        {"code_url": "", "dataset_url": "", "model_url": "https://huggingface.co/org/m2"},
+        {"code_url": "", "dataset_url": "", "model_url": "https://huggingface.co/org/m3"},
+    ]
+    resolved = list(carry_forward(lines))
+    assert [l["code_url"] for l in resolved] == ["https://github.com/org/repo"] * 3
+    assert resolved[2]["datasets"] == ["https://huggingface.co/datasets/org/ds"]
+
+    calls = []
+    lock = threading.Lock()
+
+    def fake_get(url, **kwargs):
+        with lock:
+            calls.append(url)
+        time.sleep(0.01)
+        payload = {"id": "x", "downloads": 0} if "huggingface.co/api/" in url else [] if "contributors" in url \
+            else {"pushed_at": "2024-01-01T00:00:00Z"}
+        return MagicMock(status_code=200, links={}, json=lambda: payload,
+                         encoding="utf-8", text="readme")
+
+    with patch("model.net.get", side_effect=fake_get):
+        plan = Plan(resolved)
+        assert plan.github_repos == [("org", "repo")]
+        plan.prefetch(max_workers=8)
+        assert calls.count("https://api.github.com/repos/org/repo") == 1
+        assert calls.count("https://api.github.com/repos/org/repo/contributors") == 1
+        assert calls.count("https://github.com/org/repo/raw/HEAD/README.md") == 1
+        assert calls.count("https://huggingface.co/datasets/org/ds/raw/main/README.md") == 1
+        assert calls.count("https://huggingface.co/api/datasets/org/ds") == 1
+        assert sum("api/models" in c for c in calls) == 3
+
+        # Scoring afterwards is served from the shared store
+        before = len(calls)
+        metrics = Metrics(resolved[1], store=plan.store)
+        metrics.run()
+        assert len(calls) == before
+        assert metrics.mod.datasets == ["https://huggingface.co/datasets/org/ds"]
+
+
+def test_dataset_metrics_use_dataset_info():
+    def fake_get(url, **kwargs):
+        if "api/datasets" in url:
+            payload = {"id": "org/ds", "downloads": 60000, "cardData": {"license": "mit"}}
+        elif "api/models" in url:
+            payload = {"id": "org/m", "downloads": 5}
+        else:
+            # No dataset README: the card fields stand in
+            return MagicMock(status_code=404)
+        return MagicMock(status_code=200, json=lambda: payload)
+
+    with patch("model.net.get", side_effect=fake_get) as mock_get:
+        metrics = Metrics({"code_url": "", "dataset_url": "https://huggingface.co/datasets/org/ds",
+                           "model_url": "https://huggingface.co/org/m"})
+        assert metrics.mod.get_downloads() == 5
+        assert metrics.mod.get_downloads("dataset") == 60000
+        assert metrics.mod.kw_check(["license"], "dataset")
+        # Downloads (0.15) and card keywords (0.5); the card is under 820 words
+        assert metrics.compute_ds_quality()["dataset_quality"] == 0.65
+        urls = [c.args[0] for c in mock_get.call_args_list]
+        assert urls.count("https://huggingface.co/api/datasets/org/ds") == 1
+
+
+def test_stub_server_serves_real_model_code_paths(stub):
+    stub.config.readme_bytes = 2048
+    result = Metrics({"code_url": "https://github.com/owner/repo",
+                      "dataset_url": "https://huggingface.co/datasets/org/ds",
+                      "model_url": "https://huggingface.co/org/model"}).run()
+
+    assert result["bus_factor"] == 1.0
+    assert result["ramp_up_time"] > 0
+    assert stub.counts[("api.github.com", "repos")] == 1
+    assert stub.counts[("huggingface.co", "api/models")] == 1
+
+
+def test_trace_records_http_cache_strip_and_metric_spans(tmp_path, stub):
+    import json
+    import net
+    import tracing
+
+    net.configure_cache(str(tmp_path / "cache.db"))
+    tracing.enable()
+    try:
+        result = Metrics({"code_url": "https://github.com/owner/repo", "dataset_url": "",
+                          "model_url": "https://huggingface.co/org/model"}).run()
+    finally:
+        net.configure_cache(None)
+        tracer = tracing.disable()
+
+    cats = {s["cat"] for s in tracer.spans}
+    assert {"http", "cache", "strip", "metric", "resource"} <= cats
+    http = [s for s in tracer.spans if s["cat"] == "http"]
+    assert all(s["args"]["cache"] == "miss" and s["args"]["status"] == 200 for s in http)
+    assert {s["name"] for s in tracer.spans if s["cat"] == "metric"} == {
+        task.__name__ for task in Metrics({})._tasks()}
+    assert isinstance(result["ramp_up_time_latency"], int)
+
+    tracer.write(str(tmp_path / "trace.json"))
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert all(e["ph"] in ("X", "M") for e in events)
+
+
+def test_errors_are_logged_not_printed_and_counted(capsys, caplog):
+    import json
+    import logging
+    import logs
+    import stats
+
+    stats.reset()
+    stats.count_logs()
+    with patch("model.net.get", side_effect=ConnectionError("boom")):
+        from model import Model
+        with caplog.at_level(logging.WARNING):
+            assert Model("", "", "https://huggingface.co/org/m").metadata is None
+
+    assert capsys.readouterr().out == ""
+    record = caplog.records[-1]
+    assert record.name == "model" and record.repo == "org/m"
+    assert json.loads(logs.JsonFormatter().format(record))["resource"] == "metadata"
+    assert stats.LOG_MESSAGES.value("model", "WARNING") == 1
+
+    stats.HTTP_SECONDS.observe("h", value=0.003)
+    text = stats.render()
+    assert 'score_http_request_seconds_bucket{host="h",le="0.005"} 1' in text
+    assert 'score_http_request_seconds_count{host="h"} 1' in text
+    assert 'score_log_messages_total{logger="model",level="WARNING"} 1' in text
+
+
+def test_incremental_state_reuses_unchanged_metrics(tmp_path, stub):
+    from state import StateStore
+
+    line = {"code_url": "https://github.com/owner/repo", "dataset_url": "https://huggingface.co/datasets/org/ds",
+            "model_url": "https://huggingface.co/org/model"}
+    state = StateStore(str(tmp_path / "state.db"))
+    first = Metrics(line, state=state).run()
+    stub.reset_counts()
+    second = Metrics(line, state=state).run()
+    reused = stub.reset_counts()
+
+    # A new push invalidates the metrics reading the code repo only
+    stub.config.replay["api.github.com/repos/owner/repo"] = {
+        "body": {"pushed_at": "2001-01-01T00:00:00Z", "stargazers_count": 1, "forks_count": 1}}
+    third = Metrics(line, state=state).run()
+    changed = stub.reset_counts()
+
+    strip_latency = lambda r: {k: v for k, v in r.items() if not k.endswith("_latency")}
+    assert strip_latency(second) == strip_latency(first)
+    assert set(reused) == {("huggingface.co", "api/models"), ("huggingface.co", "api/datasets"),
+                           ("api.github.com", "repos")}
+    assert ("github.com", "raw") in changed
+    assert ("huggingface.co", "raw") not in changed
+    assert third["code_quality"] != first["code_quality"]
+
+
+def test_metric_subset_fetches_only_declared_resources(stub):
+    import main
+    import registry
+
+    line = {"code_url": "https://github.com/owner/gate", "dataset_url": "https://huggingface.co/datasets/org/ds",
+            "model_url": "https://huggingface.co/org/gate-model"}
+    assert registry.needed_resources(registry.select(["dataset_quality"])) == ["dataset_info", "dataset_readme"]
+    with pytest.raises(ValueError):
+        Metrics(line, metrics=["no_such_metric"])
+
+    gate = Metrics(line, concurrent=True, metrics=["license", "size_score"]).run()
+    gate_requests = stub.reset_counts()
+    # The GitHub license is only looked up for a card without one
+    stub.config.replay["huggingface.co/api/models/org/unlicensed"] = {
+        "body": {"id": "org/unlicensed", "siblings": []}}
+    unlicensed = dict(line, model_url="https://huggingface.co/org/unlicensed")
+    Metrics(unlicensed, concurrent=True, metrics=["license"]).run()
+    fallback_requests = stub.reset_counts()
+    # Through the CLI pipeline (prefetch plan, then the DAG): only the code README
+    perf_line = {"code_url": "https://github.com/owner/perf",
+                 "dataset_url": "https://huggingface.co/datasets/org/perf",
+                 "model_url": "https://huggingface.co/org/perf-model"}
+    perf = list(main.score_inputs([perf_line], main.build_parser().parse_args(
+        ["x", "--metrics", "performance_claims"])))
+    perf_requests = stub.reset_counts()
+    full = Metrics(line, concurrent=True).run()
+    serial = Metrics(line).run()
+
+    assert list(gate) == ["name", "category", "license", "license_latency", "size_score", "size_score_latency"]
+    assert set(gate_requests) == {("huggingface.co", "api/models")}
+    assert set(fallback_requests) == {("huggingface.co", "api/models"), ("api.github.com", "repos")}
+    assert list(perf[0]) == ["name", "category", "performance_claims", "performance_claims_latency"]
+    assert set(perf_requests) == {("github.com", "raw")}
+    assert list(full) == list(serial)
+    assert {k: v for k, v in full.items() if not k.endswith("_latency")} == \
+        {k: v for k, v in serial.items() if not k.endswith("_latency")}
+
+
+def test_batch_scores_match_scalar_metrics_bit_for_bit():
+    import random
+    import numpy as np
+    import batch
+    from readme import RAMP_UP_SECTIONS
+
+    class Section:
+        def __init__(self, words):
+            self.words = dict(zip(RAMP_UP_SECTIONS, words))
+
+        def section_words(self, section, sections):
+            return self.words[section]
+
+        def contains_any(self, kws):
+            return self.perf
+
+    class FakeModel:
+        def __init__(self, s):
+            self.s = s
+            self.code_dict = {"url": "x"} if s["has_code"] else {}
+            self.dataset_dict = {"url": "x"} if s["has_dataset"] else {}
+
+        def get_license(self): return self.s["license"]
+        def get_size(self): return self.s["size_gb"]
+        def get_contrib(self): return self.s["contributors"]
+        def get_downloads(self, type="model"): return self.s["dataset_downloads"]
+        def get_git_stats(self): return {"stars": self.s["stars"], "forks": self.s["forks"]}
+        def kw_check(self, kw, which): return self.s["dataset_keywords"]
+        def last_modified(self, type, days): return self.s["maintained"]
+
+        def len_readme(self, which):
+            return self.s["code_readme_words" if which == "code" else "dataset_readme_words"]
+
+        def readme_analysis(self, which):
+            section = Section(self.s["ramp_up_words"])
+            section.perf = self.s["perf_claims"]
+            return section
+
+    rng = random.Random(7)
+    rows = []
+    for i in range(3000):
+        rows.append({
+            "license": rng.choice(["MIT", "apache-2.0", "GPL-3.0", "Unknown", "BSD-3-Clause"]),
+            # Sizes on a 1/400 GB grid hit the .xx5 rounding ties
+            "size_gb": rng.choice([0.0, rng.randint(1, 8000) / 400, rng.uniform(0, 20)]),
+            "ramp_up_words": [rng.choice([0, rng.randint(0, 80)]) for _ in RAMP_UP_SECTIONS],
+            "contributors": rng.randint(0, 15),
+            "perf_claims": rng.random() < 0.5,
+            "has_code": rng.random() < 0.8,
+            "has_dataset": rng.random() < 0.6,
+            "dataset_readme_words": rng.randint(0, 2000),
+            "dataset_downloads": rng.choice([0, 49999, 50000, 99999, 100000, rng.randint(0, 300000)]),
+            "dataset_keywords": rng.random() < 0.5,
+            "stars": rng.choice([9999, 10000, rng.randint(0, 50000)]),
+            "forks": rng.choice([4999, 5000, rng.randint(0, 9000)]),
+            "code_readme_words": rng.choice([999, 1000, 1699, 1700, rng.randint(0, 3000)]),
+            "maintained": rng.random() < 0.5,
+        })
+
+    scores = batch.score_batch(batch.columns(rows))
+    for i, row in enumerate(rows):
+        metrics = Metrics.__new__(Metrics)
+        metrics.mod = FakeModel(row)
+        scalar = {}
+        for task in (metrics.compute_license, metrics.compute_size, metrics.compute_ramp_up,
+                     metrics.compute_bus_factor, metrics.compute_perf_claims, metrics.compute_ds_code,
+                     metrics.compute_ds_quality, metrics.compute_code_quality):
+            scalar.update(task())
+        scalar.update(metrics.compute_net(scalar))
+
+        assert list(scalar["size_score"].values()) == list(scores["size_score"][i])
+        for field in ("license", "ramp_up_time", "bus_factor", "performance_claims", "dataset_and_code_score",
+                      "dataset_quality", "code_quality", "net_score"):
+            assert scalar[field] == scores[field][i], (i, field)
+
+
+def test_daemon_streams_jobs_and_reuses_warm_store(stub):
+    import json
+    import server
+    from main import build_parser
+
+    job = {"id": "a", "lines": ["https://github.com/owner/daemon,https://huggingface.co/datasets/org/ds,"
+                                "https://huggingface.co/org/daemon-model", ",,https://huggingface.co/org/other"]}
+    jobs = [json.dumps(job), json.dumps({"id": "b", "model_url": "https://huggingface.co/org/other",
+                                         "metrics": ["license"]}),
+            json.dumps({"id": "c", "metrics": ["bogus"], "model_url": "x"}), "not json", json.dumps(job)]
+    daemon = server.Daemon(build_parser().parse_args(["serve", "--jobs", "4"]))
+    out = []
+    try:
+        daemon.serve_lines(jobs[:4], out.append)
+        first = stub.reset_counts()
+        daemon.serve_lines(jobs[4:], out.append)
+        repeat = stub.reset_counts()
+    finally:
+        daemon.close()
+
+    assert [r["name"] for r in out[:2]] == ["daemon-model", "other"]
+    # The second line carried the first line's code and dataset forward
+    assert out[1]["dataset_and_code_score"] == 1.0
+    assert out[2] == {"job": "a", "done": True, "count": 2, "seconds": out[2]["seconds"]}
+    assert list(out[3]) == ["name", "category", "license", "license_latency"]
+    assert out[4]["job"] == "b" and out[4]["done"]
+    assert out[5]["job"] == "c" and "Unknown metrics" in out[5]["error"]
+    assert out[6]["job"] is None and "Invalid job" in out[6]["error"]
+    strip_latency = lambda r: {k: v for k, v in r.items() if not k.endswith("_latency")}
+    assert [strip_latency(r) for r in out[7:9]] == [strip_latency(r) for r in out[:2]]
+    assert first and not repeat
+
+
+def test_cli_light_paths_do_not_import_heavy_modules():
+    import subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    heavy = ("pytest", "requests", "huggingface_hub", "metrics", "model")
+    check = f"import sys; print(sorted(m for m in {heavy!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", "import main, sys; sys.argv = ['main.py', '--help']\n"
+                          "try:\n    main.main(sys.argv)\nexcept SystemExit:\n    pass\n" + check],
+                         cwd=root, capture_output=True, text=True)
+    assert out.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_deadline_marks_cut_metrics_partial_and_bounds_the_line(stub):
+    import time
+
+    line = {"code_url": "https://github.com/owner/slow", "dataset_url": "https://huggingface.co/datasets/org/slow",
+            "model_url": "https://huggingface.co/org/slow-model"}
+    stub.config.latency_ms = 400
+    t0 = time.perf_counter()
+    cut = Metrics(line, concurrent=True, deadline=0.2).run()
+    elapsed = time.perf_counter() - t0
+    metric_cut = Metrics(line, metrics=["license", "dataset_and_code_score"], metric_deadline=0.2).run()
+
+    assert elapsed < 1.0
+    # Every metric that needed the network was cut; dataset_and_code_score needs none
+    assert cut["partial"] == ["ramp_up_time", "bus_factor", "performance_claims", "license", "size_score",
+                              "dataset_quality", "code_quality"]
+    assert cut["size_score"] == {dev: 0.0 for dev in cut["size_score"]} and cut["license"] == 0.0
+    assert metric_cut["partial"] == ["license"] and metric_cut["dataset_and_code_score"] == 1.0
+
+
+def test_hedged_get_returns_the_first_answer():
+    import time
+    import threading
+    import net
+    import stats
+
+    slow, fast = MagicMock(status_code=200, headers={}), MagicMock(status_code=200, headers={})
+    hedge_sent = threading.Event()
+
+    def request(method, url, **kwargs):
+        if not hedge_sent.is_set():
+            hedge_sent.set()
+            time.sleep(0.5)
+            return slow
+        return fast
+
+    session = MagicMock()
+    session.request.side_effect = request
+    net.configure_hedging(0.05)
+    try:
+        with patch("net.get_session", return_value=session), patch("net.get_cache", return_value=None):
+            res = net.get("https://api.github.com/repos/org/hedged", timeout=10)
+    finally:
+        net.configure_hedging(None)
+
+    assert res is fast
+    assert session.request.call_count == 2
+    assert stats.HTTP_HEDGES.value("api.github.com", "won") >= 1
+
+
+def test_size_head_fallback_keeps_the_metric_deadline(stub):
+    import time
+    from resources import ResourceStore
+
+    # Sibling sizes missing from the listing: get_size falls back to HEADs
+    listing = {"id": "org/nosize", "siblings": [{"rfilename": "model.safetensors"},
+                                                {"rfilename": "extra.safetensors"}]}
+    line = {"code_url": "", "dataset_url": "", "model_url": "https://huggingface.co/org/nosize"}
+    store = ResourceStore()
+    stub.config.latency_ms = 600
+    stub.config.replay["huggingface.co/api/models/org/nosize"] = {"body": listing}
+    Metrics(line, store=store, metrics=["license"]).run()
+    t0 = time.perf_counter()
+    cut = Metrics(line, store=store, metrics=["size_score"], metric_deadline=0.2).run()
+    elapsed = time.perf_counter() - t0
+    heads = stub.reset_counts()[("huggingface.co", "resolve")]
+
+    assert heads == 2
+    assert cut["partial"] == ["size_score"]
+    assert elapsed < 0.5
+
+
+def test_shared_fetch_cut_by_one_lines_deadline_is_retried_by_the_other(stub):
+    from concurrent.futures import ThreadPoolExecutor
+    from resources import ResourceStore
+
+    line = {"code_url": "https://github.com/owner/shared", "dataset_url": "",
+            "model_url": "https://huggingface.co/org/shared-model"}
+    store = ResourceStore()
+    stub.config.latency_ms = 400
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        short = pool.submit(Metrics(line, store=store, metrics=["code_quality"], deadline=0.2).run)
+        unbounded = pool.submit(Metrics(line, store=store, metrics=["code_quality"]).run)
+        short, unbounded = short.result(), unbounded.result()
+
+    assert short["partial"] == ["code_quality"]
+    assert "partial" not in unbounded
+
+
+def test_waiter_stops_waiting_for_a_shared_fetch_at_its_own_deadline():
+    import time
+    import threading
+    import net
+    from resources import ResourceStore
+
+    store = ResourceStore()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    owner = threading.Thread(target=store.get, args=("key", slow_load))
+    owner.start()
+    started.wait(5)
+    t0 = time.perf_counter()
+    with pytest.raises(net.DeadlineExceeded), net.deadline(0.1):
+        store.get("key", slow_load)
+    elapsed = time.perf_counter() - t0
+    release.set()
+    owner.join()
+
+    assert elapsed < 0.5
+    assert store.get("key", slow_load) == "done"
+
+
+def test_exhausted_quota_fails_fast_until_a_distant_reset():
+    import time
+    import net
+
+    exhausted = MagicMock(status_code=403, headers={"X-RateLimit-Remaining": "0",
+                                                    "X-RateLimit-Reset": str(int(time.time()) + 3600)})
+    session = MagicMock()
+    session.request.return_value = exhausted
+    try:
+        with patch("net.get_session", return_value=session), patch("net.get_cache", return_value=None), \
+                patch("net.time.sleep") as mock_sleep:
+            assert net.get("https://api.github.com/repos/org/a").status_code == 403
+            with pytest.raises(net.RateLimited):
+                net.get("https://api.github.com/repos/org/b")
+            # Other hosts are unaffected
+            net.get("https://huggingface.co/api/models/org/m")
+    finally:
+        net._blocked_until.clear()
+
+    assert session.request.call_count == 2
+    assert not mock_sleep.called
+
+
+def test_github_hosted_dataset_is_rescored_after_a_push(tmp_path, stub):
+    from state import StateStore
+
+    line = {"code_url": "https://github.com/owner/repo", "dataset_url": "https://github.com/org/data",
+            "model_url": "https://huggingface.co/org/model"}
+    state = StateStore(str(tmp_path / "state.db"))
+    metrics = ["dataset_quality"]
+    Metrics(line, state=state, metrics=metrics).run()
+    stub.reset_counts()
+    Metrics(line, state=state, metrics=metrics).run()
+    reused = stub.reset_counts()
+
+    stub.config.replay["api.github.com/repos/org/data"] = {"body": {"pushed_at": "2001-01-01T00:00:00Z"}}
+    Metrics(line, state=state, metrics=metrics).run()
+    changed = stub.reset_counts()
+
+    assert ("github.com", "raw") not in reused
+    assert ("github.com", "raw") in changed
+
+
+def test_dag_charges_each_metric_its_resource_wait(stub):
+    line = {"code_url": "https://github.com/owner/timed", "dataset_url": "https://huggingface.co/datasets/org/timed",
+            "model_url": "https://huggingface.co/org/timed-model"}
+    stub.config.latency_ms = 100
+    result = Metrics(line, concurrent=True).run()
+
+    # Every metric reading the network waited at least one 100 ms round trip
+    for field in ("ramp_up_time", "bus_factor", "performance_claims", "license", "size_score",
+                  "dataset_quality", "code_quality"):
+        assert 90 <= result[f"{field}_latency"] <= result["net_score_latency"]
+
+
+def test_prefetch_runs_a_window_ahead_and_counts_toward_line_latency(stub):
+    import main
+
+    read = []
+
+    def lines():
+        for i in range(20):
+            read.append(i)
+            yield {"code_url": f"https://github.com/owner/ahead{i}", "dataset_url": "",
+                   "model_url": f"https://huggingface.co/org/ahead{i}"}
+
+    stub.config.latency_ms = 100
+    results = main.score_inputs(lines(), main.build_parser().parse_args(["x", "--metrics", "license"]))
+    first = next(results)
+    read_at_first = len(read)
+    rest = list(results)
+
+    # The first line is out once the window ahead of it is in, not the whole file
+    assert read_at_first == 5 and len(rest) == 19
+    # Its prefetched model info round trip counts toward it
+    assert all(r["license_latency"] >= 90 for r in [first] + rest)
@@ -0,0 +1,93 @@
+# tracing.py
+# Opt-in span recorder for seeing where scoring time goes. Spans use
+# perf_counter_ns and cover HTTP requests, cache lookups, shared-resource
+# loads and waits, README stripping and metrics. Disabled (the default)
+# every span() is a no-op. Export as a flat JSON list or as Chrome trace
+# events (chrome://tracing, Perfetto).
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+
+    def record(self, name: str, cat: str, start_ns: int, end_ns: int, args: Dict[str, Any]) -> None:
+        entry = {
+            "name": name,
+            "cat": cat,
+            "start_us": (start_ns - self._origin_ns) / 1000.0,
+            "dur_us": (end_ns - start_ns) / 1000.0,
+            "tid": threading.get_ident(),
+            "thread": threading.current_thread().name,
+            "args": args,
+        }
+        with self._lock:
+            self.spans.append(entry)
+
+    def chrome_events(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        events = [{
+            "name": s["name"], "cat": s["cat"], "ph": "X",
+            "ts": s["start_us"], "dur": s["dur_us"],
+            "pid": pid, "tid": s["tid"], "args": s["args"],
+        } for s in spans]
+        threads = {s["tid"]: s["thread"] for s in spans}
+        events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                   for tid, name in threads.items()]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    # fmt: "chrome" (trace event format) or "json" (list of spans)
+    def write(self, path: str, fmt: str = "chrome") -> None:
+        if fmt == "chrome":
+            data: Any = self.chrome_events()
+        else:
+            with self._lock:
+                data = list(self.spans)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, default=str)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable() -> Optional[Tracer]:
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+# Time the body as one span. The yielded dict (None when tracing is off)
+# takes extra args known only at the end, e.g. the HTTP status.
+@contextmanager
+def span(name: str, cat: str, **args: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    tracer = _tracer
+    if tracer is None:
+        yield None
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = repr(e)
+        raise
+    finally:
+        tracer.record(name, cat, start, time.perf_counter_ns(), args)